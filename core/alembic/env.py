@@ -44,8 +44,19 @@ else:
 # target_metadata = mymodel.Base.metadata
 from tasks.models import *
 from users.models import *
+from jobs.models import *
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # full text search objects are created by raw DDL, see tasks.models
+    if reflected and compare_to is None:
+        if name == "search_vector" or name == "ix_tasks_search_vector":
+            return False
+        if name is not None and name.startswith("tasks_fts"):
+            return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -68,6 +79,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         # render_as_batch=True
@@ -92,7 +104,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
             # render_as_batch=True
         )
 
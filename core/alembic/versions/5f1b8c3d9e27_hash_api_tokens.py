@@ -0,0 +1,55 @@
+"""hash api tokens
+
+Revision ID: 5f1b8c3d9e27
+Revises: 9a4d2e7c1f35
+Create Date: 2026-10-18 15:07:31.642018
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1b8c3d9e27'
+down_revision: Union[str, None] = '9a4d2e7c1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+tokens = sa.table(
+    'tokens',
+    sa.column('id', sa.Integer),
+    sa.column('token', sa.String),
+    sa.column('token_hash', sa.String),
+)
+
+
+def upgrade() -> None:
+    op.add_column('tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    # existing tokens keep working, they are looked up by their digest now
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("UPDATE tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    else:
+        connection = op.get_bind()
+        for token_id, token in connection.execute(sa.select(tokens.c.id, tokens.c.token)).all():
+            connection.execute(
+                tokens.update()
+                .where(tokens.c.id == token_id)
+                .values(token_hash=hashlib.sha256(token.encode()).hexdigest())
+            )
+    with op.batch_alter_table('tokens') as batch_op:
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_unique_constraint('uq_tokens_token_hash', ['token_hash'])
+        batch_op.drop_column('token')
+
+
+def downgrade() -> None:
+    # the raw tokens are gone, so every token is revoked by a downgrade
+    op.execute(tokens.delete())
+    with op.batch_alter_table('tokens') as batch_op:
+        batch_op.add_column(sa.Column('token', sa.String(), nullable=False))
+        batch_op.create_unique_constraint('uq_tokens_token', ['token'])
+        batch_op.drop_constraint('uq_tokens_token_hash', type_='unique')
+        batch_op.drop_column('token_hash')
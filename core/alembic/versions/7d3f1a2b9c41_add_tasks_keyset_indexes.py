@@ -0,0 +1,28 @@
+"""add tasks keyset indexes
+
+Revision ID: 7d3f1a2b9c41
+Revises: 49cc03942a57
+Create Date: 2026-10-18 09:12:04.218311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1a2b9c41'
+down_revision: Union[str, None] = '49cc03942a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_user_id_id', 'tasks', ['user_id', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_is_completed_id', 'tasks', ['user_id', 'is_completed', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_user_id_is_completed_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_id', table_name='tasks')
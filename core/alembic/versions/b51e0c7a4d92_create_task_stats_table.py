@@ -0,0 +1,39 @@
+"""create task stats table
+
+Revision ID: b51e0c7a4d92
+Revises: 7d3f1a2b9c41
+Create Date: 2026-10-18 10:41:37.905412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b51e0c7a4d92'
+down_revision: Union[str, None] = '7d3f1a2b9c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('task_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # backfill the counters of existing tasks
+    op.execute(
+        "INSERT INTO task_stats (user_id, total, completed) "
+        "SELECT user_id, COUNT(id), "
+        "COALESCE(SUM(CASE WHEN is_completed THEN 1 ELSE 0 END), 0) "
+        "FROM tasks WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_stats')
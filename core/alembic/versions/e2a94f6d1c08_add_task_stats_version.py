@@ -0,0 +1,26 @@
+"""add task stats version
+
+Revision ID: e2a94f6d1c08
+Revises: b51e0c7a4d92
+Create Date: 2026-10-18 11:58:20.114736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a94f6d1c08'
+down_revision: Union[str, None] = 'b51e0c7a4d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('task_stats', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('task_stats', 'version')
@@ -1,21 +1,54 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import hmac
+import secrets
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from users.models import UserModel
-from core.database import get_db
-from sqlalchemy.orm import Session
+from auth.hashing import password_hasher
+from auth.principal import Principal, principal_cache
+from core.cache import TTLCache
+from core.config import settings
+from core.database import get_async_read_db, read_from_primary, remember_user
 
 security = HTTPBasic()
 
+# credentials are only kept as an hmac under a key that never leaves the process
+_credentials_key = secrets.token_bytes(32)
+verified_credentials = TTLCache(
+    maxsize=settings.BASIC_AUTH_CACHE_SIZE, ttl=settings.BASIC_AUTH_CACHE_TTL
+)
 
-def get_authenticated_user(
+
+def _credentials_digest(credentials: HTTPBasicCredentials) -> bytes:
+    message = f"{credentials.username}\0{credentials.password}".encode()
+    return hmac.new(_credentials_key, message, hashlib.sha256).digest()
+
+
+def _forget_user(user_id: int) -> None:
+    verified_credentials.evict(lambda principal: principal.id == user_id)
+
+
+principal_cache.listeners.append(_forget_user)
+
+
+async def get_authenticated_user(
+    request: Request,
     credentials: HTTPBasicCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    user_obj = (
-        db.query(UserModel)
-        .filter_by(username=credentials.username)
-        .one_or_none()
+    digest = _credentials_digest(credentials)
+    principal = verified_credentials.get(digest)
+    if principal is not None:
+        await remember_user(request, db, principal.id)
+        return principal
+
+    read_from_primary(db)
+    result = await db.execute(
+        select(UserModel).filter_by(username=credentials.username)
     )
+    user_obj = result.scalars().one_or_none()
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,10 +56,17 @@ def get_authenticated_user(
             headers={"WWW-Authenticate": "Basic"},
         )
 
-    if not user_obj.verify_password(credentials.password):
+    if not await password_hasher.verify(credentials.password, user_obj.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
-    return user_obj
+    principal = Principal(
+        id=user_obj.id,
+        username=user_obj.username,
+        is_active=bool(user_obj.is_active),
+    )
+    verified_credentials.set(digest, principal)
+    await remember_user(request, db, principal.id)
+    return principal
@@ -1,55 +1,60 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from users.models import UserModel
-from core.database import get_db
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta,timezone
+from auth.principal import resolve_principal
+from core.cache import TTLCache
+from core.database import get_async_read_db, remember_user
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+import time
 import jwt
 from jwt.exceptions import DecodeError, InvalidSignatureError
 from core.config import settings
 
 security = HTTPBearer(auto_error=False)
 
+# (user_id, type, exp) of tokens whose signature was already verified, keyed
+# by a digest of the token and kept until the token expires
+claims_cache = TTLCache(maxsize=settings.JWT_CLAIMS_CACHE_SIZE, ttl=0)
 
 
-def get_authenticated_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-
-    # Check if credentials are not provided
-    if not credentials or not credentials.credentials:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication failed, token not provided",
-        )
+def verify_token(token: str, token_type: str) -> int:
+    """Returns the user id of a valid token of the given type.
 
-    token = credentials.credentials
+    A token seen before skips the signature check; type and expiry are
+    checked on every call, against integer unix timestamps.
+    """
     try:
-        decoded = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms="HS256"
-        )
-        user_id = decoded.get("user_id", None)
+        key = hashlib.sha256(token.encode()).digest()
+        now = int(time.time())
+        claims = claims_cache.get(key)
+        if claims is None:
+            decoded = jwt.decode(
+                token, settings.JWT_SECRET_KEY, algorithms="HS256"
+            )
+            claims = (decoded.get("user_id", None), decoded.get("type"), int(decoded.get("exp")))
+            if claims[2] > now:
+                claims_cache.set(key, claims, ttl=claims[2] - now)
+        user_id, claimed_type, exp = claims
+
         if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Authentication failed, user_id not in the payload",
             )
-
-        if decoded.get("type") != "access":
+        if claimed_type != token_type:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Authentication failed, token type not valid",
             )
-        if datetime.now() > datetime.fromtimestamp(decoded.get("exp")):
+        if now >= exp:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Authentication failed, token expired",
             )
+        return user_id
 
-        user_obj = db.query(UserModel).filter_by(id=user_id).one()
-        return user_obj
-
+    except HTTPException:
+        raise
     except InvalidSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,65 +71,57 @@ def get_authenticated_user(
             detail=f"Authentication failed, {e}",
         )
 
+
+async def get_authenticated_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+
+    # Check if credentials are not provided
+    if not credentials or not credentials.credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed, token not provided",
+        )
+
+    user_id = verify_token(credentials.credentials, "access")
+    await remember_user(request, db, user_id)
+    principal = await resolve_principal(db, user_id)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed, user not found",
+        )
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed, user is not active",
+        )
+    return principal
+
+
 def generate_access_token(user_id: int, expires_in: int = 60 * 5) -> str:
-    now = datetime.now(timezone.utc)
+    now = int(time.time())
     payload = {
         "type": "access",
         "user_id": user_id,
         "iat": now,
-        "exp": now + timedelta(seconds=expires_in),
+        "exp": now + expires_in,
     }
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
 
 
 def generate_refresh_token(user_id: int, expires_in: int = 3600 * 24) -> str:
-    now = datetime.now(timezone.utc)
+    now = int(time.time())
     payload = {
         "type": "refresh",
         "user_id": user_id,
         "iat": now,
-        "exp": now + timedelta(seconds=expires_in),
+        "exp": now + expires_in,
     }
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
 
 
 def decode_refresh_token(token):
-    try:
-        decoded = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms="HS256"
-        )
-        user_id = decoded.get("user_id", None)
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authentication failed, user_id not in the payload",
-            )
-
-        if decoded.get("type") != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authentication failed, token type not valid",
-            )
-        if datetime.now() > datetime.fromtimestamp(decoded.get("exp")):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authentication failed, token expired",
-            )
-
-        return user_id
-
-    except InvalidSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication failed, invalid signature",
-        )
-    except DecodeError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication failed, decode failed",
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Authentication failed, {e}",
-        )
+    return verify_token(token, "refresh")
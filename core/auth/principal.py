@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, asdict
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from redis.exceptions import RedisError
+from users.models import UserModel
+from core.cache import TTLCache
+from core.config import settings
+from core.database import read_from_primary
+from core.redis_client import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user as routes see it, without the ORM object."""
+
+    id: int
+    username: str
+    is_active: bool
+
+
+class PrincipalCache:
+    """Caches principals by user id in process, optionally backed by redis.
+
+    The local tier absorbs repeated requests of the same user on a worker, the
+    redis tier shares lookups between workers. Redis failures count as misses.
+    """
+
+    key_prefix = "principal:"
+
+    def __init__(self, maxsize: int, ttl: float, redis_ttl: int, use_redis: bool):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis_ttl = redis_ttl
+        self.use_redis = use_redis
+        self.redis_hits = 0
+        self.db_lookups = 0
+        # other caches holding per-user auth state, called with the user id
+        self.listeners = []
+        self._pending = set()
+
+    async def get(self, user_id: int):
+        principal = self.local.get(user_id)
+        if principal is not None or not self.use_redis:
+            return principal
+        try:
+            raw = await get_redis().get(f"{self.key_prefix}{user_id}")
+        except (RedisError, OSError) as e:
+            logger.warning("principal cache redis read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        self.redis_hits += 1
+        principal = Principal(**json.loads(raw))
+        self.local.set(user_id, principal)
+        return principal
+
+    async def set(self, principal: Principal) -> None:
+        self.local.set(principal.id, principal)
+        if not self.use_redis:
+            return
+        try:
+            await get_redis().set(
+                f"{self.key_prefix}{principal.id}",
+                json.dumps(asdict(principal)),
+                ex=self.redis_ttl,
+            )
+        except (RedisError, OSError) as e:
+            logger.warning("principal cache redis write failed: %s", e)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drops the user from both tiers.
+
+        Inside the event loop the redis delete runs in background, outside of
+        it (scripts, alembic, sync sessions) it runs blocking right away.
+        """
+        self.local.pop(user_id)
+        for listener in self.listeners:
+            listener(user_id)
+        if not self.use_redis:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._sync_redis_delete(user_id)
+            return
+        task = loop.create_task(self._redis_delete(user_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _redis_delete(self, user_id: int) -> None:
+        try:
+            await get_redis().delete(f"{self.key_prefix}{user_id}")
+        except (RedisError, OSError) as e:
+            logger.warning("principal cache redis delete failed: %s", e)
+
+    def _sync_redis_delete(self, user_id: int) -> None:
+        try:
+            get_sync_redis().delete(f"{self.key_prefix}{user_id}")
+        except (RedisError, OSError) as e:
+            logger.warning("principal cache redis delete failed: %s", e)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {
+            "local_hits": self.local.hits,
+            "redis_hits": self.redis_hits,
+            "db_lookups": self.db_lookups,
+            "size": len(self.local),
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL,
+    use_redis=settings.PRINCIPAL_CACHE_REDIS,
+)
+
+
+async def resolve_principal(db: AsyncSession, user_id: int):
+    """Returns the principal of a user id, hitting the database only on miss."""
+    principal = await principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    principal_cache.db_lookups += 1
+    read_from_primary(db)
+    result = await db.execute(
+        select(UserModel.id, UserModel.username, UserModel.is_active).filter_by(
+            id=user_id
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    principal = Principal(
+        id=row.id, username=row.username, is_active=bool(row.is_active)
+    )
+    await principal_cache.set(principal)
+    return principal
+
+
+# invalidation: changes to the cached fields or the password are collected
+# during flush and applied once the transaction actually commits
+
+INVALIDATED_KEY = "invalidated_principals"
+
+
+def _mark_invalidated(target: UserModel) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(INVALIDATED_KEY, set()).add(target.id)
+
+
+@event.listens_for(UserModel, "after_update")
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(
+        state.attrs[name].history.has_changes()
+        for name in ("is_active", "password", "username")
+    ):
+        _mark_invalidated(target)
+
+
+@event.listens_for(UserModel, "after_delete")
+def _user_deleted(mapper, connection, target):
+    _mark_invalidated(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop(INVALIDATED_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(INVALIDATED_KEY, None)
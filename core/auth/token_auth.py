@@ -1,26 +1,218 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import logging
+import secrets
+import time
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from redis.exceptions import RedisError
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from users.models import UserModel, TokenModel
-from core.database import get_db
-from sqlalchemy.orm import Session
+from auth.principal import Principal, principal_cache, resolve_principal
+from core.cache import TTLCache
+from core.config import settings
+from core.database import get_async_read_db, read_from_primary, remember_user
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer(scheme_name="Token")
 
 
-def get_authenticated_user(
+def hash_token(token: str) -> str:
+    """Fixed length digest the token is stored and looked up by.
+
+    Tokens are 256 bit random values, so a plain sha256 is enough; there is
+    nothing to brute force that a slow hash would protect.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# stores the mapping unless the token was revoked meanwhile, atomically
+SET_UNLESS_REVOKED_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+class TokenCache:
+    """Maps token digests to user ids, in process and in redis.
+
+    Only the user id is cached, the principal itself comes from the principal
+    cache, so deactivating a user still takes effect for its tokens. A revoke
+    leaves a tombstone in redis for `tombstone_ttl` seconds and deletes the
+    mapping, so a lookup that read the token before the revoke can not put
+    it back; the revoke fails if redis can not be reached. Other workers
+    drop their local copy within the local ttl. After a redis failure
+    lookups skip redis for `retry_after` seconds.
+    """
+
+    key_prefix = "token:"
+    tombstone_prefix = "token:revoked:"
+    tombstone_ttl = 60
+    invalidate_attempts = 3
+    retry_after = 5
+
+    def __init__(self, maxsize: int, ttl: float, redis_ttl: int, use_redis: bool):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis_ttl = redis_ttl
+        self.use_redis = use_redis
+        self.redis_hits = 0
+        self.db_lookups = 0
+        self._unavailable_until = 0.0
+        self._set_script = None
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._unavailable_until
+
+    def _redis_failed(self, e: Exception) -> None:
+        self._unavailable_until = time.monotonic() + self.retry_after
+        logger.warning("token cache redis failed: %s", e)
+
+    async def get(self, token_hash: str):
+        user_id = self.local.get(token_hash)
+        if user_id is not None or not self._redis_available():
+            return user_id
+        try:
+            raw = await get_redis().get(f"{self.key_prefix}{token_hash}")
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+        self.redis_hits += 1
+        user_id = int(raw)
+        self.local.set(token_hash, user_id)
+        return user_id
+
+    async def set(self, token_hash: str, user_id: int) -> None:
+        self.local.set(token_hash, user_id)
+        if not self._redis_available():
+            return
+        try:
+            if self._set_script is None:
+                self._set_script = get_redis().register_script(SET_UNLESS_REVOKED_LUA)
+            stored = await self._set_script(
+                keys=[
+                    f"{self.key_prefix}{token_hash}",
+                    f"{self.tombstone_prefix}{token_hash}",
+                ],
+                args=[user_id, self.redis_ttl],
+            )
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return
+        if not stored:
+            self.local.pop(token_hash)
+
+    async def invalidate(self, token_hash: str) -> None:
+        """Tombstones and deletes the token in redis, call before committing.
+
+        Raises a 503 when redis can not be reached, the caller then rolls
+        the revoke back instead of reporting a token revoked that every
+        worker would still accept for up to the redis ttl.
+        """
+        self.local.pop(token_hash)
+        if not self.use_redis:
+            return
+        for attempt in range(self.invalidate_attempts):
+            try:
+                async with get_redis().pipeline(transaction=True) as pipe:
+                    pipe.set(
+                        f"{self.tombstone_prefix}{token_hash}", 1, ex=self.tombstone_ttl
+                    )
+                    pipe.delete(f"{self.key_prefix}{token_hash}")
+                    await pipe.execute()
+                return
+            except (RedisError, OSError) as e:
+                logger.warning("token revoke redis attempt %d failed: %s", attempt + 1, e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token could not be revoked right now, try again",
+            headers={"Retry-After": "5"},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "local_hits": self.local.hits,
+            "redis_hits": self.redis_hits,
+            "db_lookups": self.db_lookups,
+            "size": len(self.local),
+        }
+
+
+token_cache = TokenCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL,
+    redis_ttl=settings.TOKEN_CACHE_REDIS_TTL,
+    use_redis=settings.TOKEN_CACHE_REDIS,
+)
+
+
+async def issue_token(db: AsyncSession, user_id: int):
+    """Creates a token for the user, returns (id, token); the caller commits.
+
+    The token is only ever shown here, the database keeps its digest.
+    """
+    token = secrets.token_hex(32)
+    result = await db.execute(
+        insert(TokenModel)
+        .values(user_id=user_id, token_hash=hash_token(token))
+        .returning(TokenModel.id)
+    )
+    return result.scalar_one(), token
+
+
+async def revoke_token(db: AsyncSession, user_id: int, token_id: int):
+    """Deletes one of the user's tokens and returns its digest, None if absent.
+
+    The caller calls token_cache.invalidate with the digest and commits
+    only once that succeeded.
+    """
+    result = await db.execute(
+        delete(TokenModel)
+        .where(TokenModel.id == token_id, TokenModel.user_id == user_id)
+        .returning(TokenModel.token_hash)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_authenticated_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    token_obj = (
-        db.query(TokenModel)
-        .filter_by(token=credentials.credentials)
-        .one_or_none()
-    )
-    if not token_obj:
+    token_hash = hash_token(credentials.credentials)
+    user_id = await token_cache.get(token_hash)
+    if user_id is not None:
+        await remember_user(request, db, user_id)
+        principal = await resolve_principal(db, user_id)
+    else:
+        # token and user in one round trip
+        token_cache.db_lookups += 1
+        read_from_primary(db)
+        result = await db.execute(
+            select(UserModel.id, UserModel.username, UserModel.is_active)
+            .join(TokenModel, TokenModel.user_id == UserModel.id)
+            .where(TokenModel.token_hash == token_hash)
+        )
+        row = result.one_or_none()
+        principal = None
+        if row is not None:
+            principal = Principal(
+                id=row.id, username=row.username, is_active=bool(row.is_active)
+            )
+            await token_cache.set(token_hash, principal.id)
+            await principal_cache.set(principal)
+            await remember_user(request, db, principal.id)
+
+    if principal is None or not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication Failed",
         )
-    # other logic
-
-    return token_obj.user
+    return principal
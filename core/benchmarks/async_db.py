@@ -0,0 +1,163 @@
+"""Concurrent throughput of the sync vs async session path.
+
+Runs the same task list query through two tiny apps, one using the blocking
+`SessionLocal` inside an `async def` handler (the old behaviour) and one using
+`AsyncSessionLocal`, then fires concurrent requests at both. Every query waits
+on a simulated server latency, the way it would against postgres.
+
+usage: python -m benchmarks.async_db --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from core.database import Base
+from tasks.models import TaskModel
+from users.models import UserModel
+
+# simulated server-side latency per query (network round trip + execution)
+QUERY_LATENCY = 0.02
+
+
+def register_latency(dbapi_connection, connection_record):
+    # sqlite runs in-process, so a sleeping sql function stands in for the
+    # time a real server keeps the client waiting; it releases the GIL
+    dbapi_connection.create_function(
+        "server_latency", 0, lambda: time.sleep(QUERY_LATENCY) or 1
+    )
+
+
+def seed(url: str, tasks: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        user = UserModel(username="benchmark", password="-")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            TaskModel(
+                user_id=user.id,
+                title=f"benchmark task {i}",
+                description="x" * 200,
+                is_completed=bool(i % 2),
+            )
+            for i in range(tasks)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def build_apps(path: str):
+    # no pooling on either side, so only the blocking behaviour differs
+    sync_engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=NullPool
+    )
+    event.listen(sync_engine, "connect", register_latency)
+    event.listen(async_engine.sync_engine, "connect", register_latency)
+
+    sync_session = sessionmaker(bind=sync_engine)
+    async_session = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    query = (
+        select(TaskModel)
+        .filter_by(user_id=1)
+        .where(text("(SELECT server_latency()) = 1"))
+    )
+
+    blocking = FastAPI()
+
+    def get_db():
+        db = sync_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @blocking.get("/tasks")
+    async def blocking_list(db=Depends(get_db)):
+        return len(db.execute(query.limit(50)).scalars().all())
+
+    non_blocking = FastAPI()
+
+    async def get_async_db():
+        async with async_session() as db:
+            yield db
+
+    @non_blocking.get("/tasks")
+    async def non_blocking_list(db=Depends(get_async_db)):
+        result = await db.execute(query.limit(50))
+        return len(result.scalars().all())
+
+    return blocking, non_blocking
+
+
+async def drive(app: FastAPI, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    lag = []
+    running = True
+
+    async def ticker():
+        # measures how late the event loop is in waking a 10ms sleeper
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - start - 0.01)
+
+    async def one(client):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get("/tasks")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    tick = asyncio.create_task(ticker())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    running = False
+    await tick
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_loop_lag_ms": max(lag, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    seed(f"sqlite:///{path}", args.tasks)
+    blocking, non_blocking = build_apps(path)
+
+    for name, app in (("sync session", blocking), ("async session", non_blocking)):
+        stats = asyncio.run(drive(app, args.requests, args.concurrency))
+        print(
+            f"{name:<14} {stats['rps']:8.1f} req/s  "
+            f"p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms  "
+            f"max loop lag {stats['max_loop_lag_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
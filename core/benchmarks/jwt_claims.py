@@ -0,0 +1,41 @@
+"""Cost of authenticating a reused access token, with and without the claims cache.
+
+Compares a full jwt.decode (signature check plus claim parsing) per request
+with auth.jwt_auth.verify_token, which verifies a token once and then only
+checks type and expiry of the cached claims.
+
+usage: python -m benchmarks.jwt_claims --rounds 100000
+"""
+
+import argparse
+import timeit
+
+import jwt
+
+from auth.jwt_auth import claims_cache, generate_access_token, verify_token
+from core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100000)
+    args = parser.parse_args()
+
+    token = generate_access_token(1)
+    claims_cache.clear()
+
+    def full_decode():
+        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms="HS256")["user_id"]
+
+    def cached():
+        return verify_token(token, "access")
+
+    assert full_decode() == cached() == 1
+    for name, fn in (("jwt.decode", full_decode), ("verify_token", cached)):
+        seconds = min(timeit.repeat(fn, number=args.rounds, repeat=5)) / args.rounds
+        print(f"{name:<14} {seconds * 1e6:7.2f} us per request")
+    print(f"claims cache   {claims_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""HTTP load test of the API with per-route latency and a regression gate.
+
+Starts the app under uvicorn against a freshly seeded database (a temporary
+sqlite file, or --database-url for a local postgres whose tables are dropped
+and recreated), then lets --concurrency virtual users run a weighted mix of
+login, list, detail, create, update and delete for --duration seconds. Every
+virtual user logs in once and works on its own user's tasks.
+
+Prints requests per second and p50/p95/p99 per route. --save-baseline
+writes the report as json; --baseline compares against such a file and exits
+with status 1 when a route's p95 grew, or its rps dropped, by more than
+--threshold.
+
+usage: python -m benchmarks.load --users 20 --tasks 200 --concurrency 20 --duration 15
+       python -m benchmarks.load --save-baseline benchmarks/baseline.json
+       python -m benchmarks.load --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+from users.models import UserModel, pwd_context
+from tasks.models import TaskModel
+from tasks.stats import rebuild_stats_statements
+import jobs.models  # noqa: F401  registers the jobs table
+
+CORE_DIR = Path(__file__).resolve().parents[1]
+PASSWORD = "benchmark-password"
+
+# relative weight of each operation in the mix
+WORKLOAD = {
+    "login": 2,
+    "list": 40,
+    "detail": 30,
+    "create": 10,
+    "update": 12,
+    "delete": 6,
+}
+
+
+def seed(url: str, users: int, tasks: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed = pwd_context.hash(PASSWORD)  # one bcrypt round for every user
+    rng = random.Random(0)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(UserModel(username=f"bench{i}", password=hashed) for i in range(users))
+        db.flush()
+        for user in db.query(UserModel).all():
+            db.add_all(
+                TaskModel(
+                    user_id=user.id,
+                    title=f"benchmark task {n} of {user.username}",
+                    description="lorem ipsum dolor sit amet " * rng.randint(0, 8),
+                    is_completed=rng.random() < 0.5,
+                )
+                for n in range(tasks)
+            )
+        db.flush()
+        for statement in rebuild_stats_statements():
+            db.execute(statement)
+        db.commit()
+    engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(url: str, port: int, workers: int, **overrides) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SQLALCHEMY_DATABASE_URL": url,
+        "TASK_CACHE_BACKEND": "memory",
+        "SENTRY_DSN": "",
+        # limiter overhead stays in the measurement, its limits do not
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_RATE": "1000000",
+        "RATE_LIMIT_BURST": "1000000",
+        "RATE_LIMIT_ROUTES": "{}",
+        **overrides,
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=CORE_DIR,
+        env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/is_ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, route: str, method: str, url: str, **kw):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kw)
+        self.latencies[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+
+async def virtual_user(base_url, number, users, deadline, recorder, rng):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        credentials = {"username": f"bench{number % users}", "password": PASSWORD}
+        response = await recorder.request(
+            client, "POST /users/login", "POST", "/users/login", json=credentials
+        )
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        task_ids = [t["id"] for t in (await client.get("/tasks?limit=50")).json()]
+        created = []
+
+        operations, weights = zip(*WORKLOAD.items())
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            if operation == "login":
+                await recorder.request(
+                    client, "POST /users/login", "POST", "/users/login", json=credentials
+                )
+            elif operation == "list":
+                params = {"limit": 20, "offset": rng.randint(0, 5) * 20}
+                await recorder.request(client, "GET /tasks", "GET", "/tasks", params=params)
+            elif operation == "detail":
+                await recorder.request(
+                    client, "GET /tasks/{task_id}", "GET", f"/tasks/{rng.choice(task_ids)}"
+                )
+            elif operation == "create":
+                payload = {"title": f"load test task {rng.random()}", "is_completed": False}
+                response = await recorder.request(
+                    client, "POST /tasks", "POST", "/tasks", json=payload
+                )
+                if response.status_code == 200:
+                    created.append(response.json()["id"])
+            elif operation == "update":
+                payload = {"title": "updated by the load test", "is_completed": rng.random() < 0.5}
+                await recorder.request(
+                    client, "PUT /tasks/{task_id}", "PUT",
+                    f"/tasks/{rng.choice(task_ids)}", json=payload,
+                )
+            elif operation == "delete" and created:
+                await recorder.request(
+                    client, "DELETE /tasks/{task_id}", "DELETE", f"/tasks/{created.pop()}"
+                )
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    results = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        results[route] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[route],
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return results
+
+
+def print_report(results: dict) -> None:
+    print(f"{'route':<24} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in results.items():
+        print(
+            f"{route:<24} {r['requests']:>8} {r['errors']:>6} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+
+def regressions(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Routes that got slower or lost throughput beyond the threshold."""
+    found = []
+    for route, base in baseline.items():
+        current = results.get(route)
+        if current is None:
+            continue
+        slower = current["p95_ms"] - base["p95_ms"]
+        if slower > min_delta_ms and current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            found.append(f"{route}: p95 {base['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current["rps"] < base["rps"] * (1 - threshold):
+            found.append(f"{route}: rps {base['rps']:.1f} -> {current['rps']:.1f}")
+        if current["errors"] > base["errors"]:
+            found.append(f"{route}: errors {base['errors']} -> {current['errors']}")
+    return found
+
+
+async def drive(base_url: str, args) -> dict:
+    await wait_until_ready(base_url)
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(
+        *(
+            virtual_user(base_url, i, args.users, deadline, recorder, random.Random(args.seed + i))
+            for i in range(args.concurrency)
+        )
+    )
+    return report(recorder, time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a temporary sqlite file")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=200, help="seeded tasks per user")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=2.0,
+        help="p95 increases below this are treated as noise",
+    )
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    seed(url, args.users, args.tasks)
+    port = free_port()
+    server = start_server(url, port, args.workers)
+    try:
+        results = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print_report(results)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        found = regressions(
+            results,
+            json.loads(Path(args.baseline).read_text()),
+            args.threshold,
+            args.min_delta_ms,
+        )
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print("no regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
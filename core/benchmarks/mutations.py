@@ -0,0 +1,135 @@
+"""Round trips per task update and delete, before and after RETURNING.
+
+The old path loaded the task, set attributes, committed and refreshed it;
+the new path is tasks.mutations. Updates are measured both for a PUT that
+flips is_completed and one that leaves it unchanged. Every statement and commit is counted and
+charged a simulated network round trip.
+
+usage: python -m benchmarks.mutations --operations 200 --rtt-ms 1
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+from tasks.models import TaskModel
+from tasks.mutations import update_task_returning, delete_task_returning
+from tasks.stats import apply_stats_delta, rebuild_stats_statements
+from users.models import UserModel
+
+
+class RoundTrips:
+    def __init__(self, engine, rtt: float):
+        self.count = 0
+        self.rtt = rtt
+        event.listen(engine, "before_cursor_execute", self.on_statement)
+        event.listen(engine, "commit", self.on_commit)
+
+    def on_statement(self, *args):
+        self.count += 1
+        time.sleep(self.rtt)
+
+    def on_commit(self, *args):
+        self.on_statement()
+
+
+def seed(path: str, tasks: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        user = UserModel(username="benchmark", password="-")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            TaskModel(user_id=user.id, title=f"benchmark task {i}", is_completed=False)
+            for i in range(tasks)
+        )
+        db.flush()
+        for statement in rebuild_stats_statements(user.id):
+            db.execute(statement)
+        db.commit()
+    engine.dispose()
+
+
+async def old_update(db, task_id, values):
+    result = await db.execute(
+        select(TaskModel).filter_by(user_id=1, id=task_id).with_for_update()
+    )
+    task_obj = result.scalars().first()
+    was_completed = bool(task_obj.is_completed)
+    for field, value in values.items():
+        setattr(task_obj, field, value)
+    await apply_stats_delta(db, 1, completed=int(task_obj.is_completed) - was_completed)
+    await db.commit()
+    await db.refresh(task_obj)
+
+
+async def new_update(db, task_id, values):
+    await update_task_returning(db, 1, task_id, values)
+    await db.commit()
+
+
+async def old_delete(db, task_id):
+    result = await db.execute(select(TaskModel).filter_by(user_id=1, id=task_id))
+    task_obj = result.scalars().first()
+    await db.delete(task_obj)
+    await apply_stats_delta(db, 1, total=-1, completed=-int(task_obj.is_completed))
+    await db.commit()
+
+
+async def new_delete(db, task_id):
+    await delete_task_returning(db, 1, task_id)
+    await db.commit()
+
+
+async def run(path: str, operations: int, rtt: float):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    trips = RoundTrips(engine.sync_engine, rtt)
+    ids = iter(range(1, operations * 6 + 1))
+    # tasks are seeded open: the flip completes them, the no-flip keeps them open
+    flip = {"title": "renamed", "is_completed": True}
+    no_flip = {"title": "renamed", "is_completed": False}
+
+    cases = (
+        ("flip put, old", lambda db, i: old_update(db, i, flip)),
+        ("flip put, new", lambda db, i: new_update(db, i, flip)),
+        ("same put, old", lambda db, i: old_update(db, i, no_flip)),
+        ("same put, new", lambda db, i: new_update(db, i, no_flip)),
+        ("delete, old", old_delete),
+        ("delete, new", new_delete),
+    )
+    for name, operation in cases:
+        trips.count = 0
+        start = time.perf_counter()
+        for _ in range(operations):
+            async with session() as db:
+                await operation(db, next(ids))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<14} {trips.count / operations:5.1f} round trips/op  "
+            f"{elapsed / operations * 1000:7.2f} ms/op"
+        )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    seed(path, args.operations * 6)
+    asyncio.run(run(path, args.operations, args.rtt_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Serialization time of a 50 item task list response.
+
+Compares what FastAPI does for an ORM list returned against
+response_model=List[TaskResponseSchema] (validate, dump, stdlib json) with the
+trusted path the task routes use now (row dicts straight into orjson).
+
+usage: python -m benchmarks.serialization --items 50 --rounds 2000
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+from tasks.models import TaskModel
+from tasks.schemas import TaskResponseSchema
+from tasks.serializers import TASK_COLUMNS, task_row_to_dict
+from users.models import UserModel  # noqa: F401  registers the users table
+
+
+def load(items: int):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(
+            TaskModel(
+                user_id=1,
+                title=f"benchmark task number {i}",
+                description="lorem ipsum dolor sit amet " * 8,
+                is_completed=bool(i % 2),
+                created_date=now,
+                updated_date=now + timedelta(minutes=i),
+            )
+            for i in range(items)
+        )
+        db.commit()
+        objects = db.execute(select(TaskModel)).scalars().all()
+        rows = db.execute(select(*TASK_COLUMNS)).all()
+        db.expunge_all()
+    return objects, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    objects, rows = load(args.items)
+    adapter = TypeAdapter(List[TaskResponseSchema])
+
+    def validated_stdlib():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def trusted_orjson():
+        return orjson.dumps([task_row_to_dict(row) for row in rows])
+
+    assert json.loads(validated_stdlib()) == json.loads(trusted_orjson())
+
+    for name, fn in (("validated + json", validated_stdlib), ("trusted + orjson", trusted_orjson)):
+        seconds = min(timeit.repeat(fn, number=args.rounds, repeat=5)) / args.rounds
+        print(f"{name:<18} {seconds * 1e6:9.1f} us per {args.items} item response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Startup cost of the app: import time and time to the first served request.
+
+Import time is measured in fresh interpreters importing `main`. Each run then
+starts uvicorn against a seeded sqlite file and records the time until
+/is_ready first answers, the latency of the first authenticated GET /tasks
+and the median of the following ones; the gap between those two is what
+the lifespan warm-up (DB_WARMUP) is meant to close.
+
+--save-baseline writes the medians as json; --baseline compares against such
+a file and exits with status 1 when a figure grew by more than --threshold.
+
+usage: python -m benchmarks.startup --runs 5
+       python -m benchmarks.startup --no-warmup
+       python -m benchmarks.startup --baseline benchmarks/startup.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from auth.jwt_auth import generate_access_token
+from benchmarks.load import CORE_DIR, free_port, seed, start_server
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_time(url: str) -> float:
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": url, "SENTRY_DSN": ""}
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=CORE_DIR, env=env, text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def first_requests(url: str, warmup: bool, requests: int) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    server = start_server(url, port, 1, DB_WARMUP=str(warmup).lower())
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            while True:
+                try:
+                    if client.get("/is_ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.01)
+            ready = time.perf_counter() - start
+
+            client.headers["Authorization"] = f"Bearer {generate_access_token(1)}"
+            latencies = []
+            for _ in range(requests):
+                began = time.perf_counter()
+                response = client.get("/tasks", params={"limit": 20})
+                latencies.append(time.perf_counter() - began)
+                response.raise_for_status()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "ready_ms": ready * 1000,
+        "first_request_ms": latencies[0] * 1000,
+        "steady_request_ms": statistics.median(latencies[1:]) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=20, help="GET /tasks per run")
+    parser.add_argument("--no-warmup", action="store_true", help="start with DB_WARMUP=false")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    seed(url, users=1, tasks=200)
+
+    imports = [import_time(url) * 1000 for _ in range(args.runs)]
+    runs = [
+        first_requests(url, not args.no_warmup, args.requests) for _ in range(args.runs)
+    ]
+    results = {"import_ms": statistics.median(imports)}
+    for key in runs[0]:
+        results[key] = statistics.median(run[key] for run in runs)
+
+    for key, value in results.items():
+        print(f"{key:<18} {value:9.2f}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        found = [
+            f"{key}: {baseline[key]:.2f} -> {value:.2f}"
+            for key, value in results.items()
+            if key in baseline and value > baseline[key] * (1 + args.threshold)
+        ]
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print("no regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
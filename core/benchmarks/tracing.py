@@ -0,0 +1,122 @@
+"""Per request cost of Sentry tracing: off, every request traced, adaptive sampler.
+
+Every mode runs in a fresh interpreter, since sentry_sdk patches Starlette
+for the life of the process. The app is driven in process over httpx'
+ASGITransport against a seeded sqlite file, and events go to a transport
+that drops them, so only the SDK's own work is measured. After a warm-up
+phase the mean time per request is taken for GET /tasks (one hot route)
+and GET /is_ready (pinned to rate 0).
+
+usage: python -m benchmarks.tracing --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("off", "full", "sampler")
+ROUTES = {"GET /tasks": "/tasks?limit=20", "GET /is_ready": "/is_ready"}
+
+
+async def measure(path: str, headers: dict, seconds: float) -> float:
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers=headers
+    ) as client:
+        deadline = time.monotonic() + seconds
+        count = 0
+        start = time.perf_counter()
+        while time.monotonic() < deadline:
+            (await client.get(path)).raise_for_status()
+            count += 1
+        return (time.perf_counter() - start) / count
+
+
+def run_mode(mode: str, warmup: float, duration: float) -> dict:
+    import sentry_sdk
+    from sentry_sdk.transport import Transport
+    from auth.jwt_auth import generate_access_token
+    from core.sentry import init_sentry, trace_sampler
+    from main import app
+
+    class DroppingTransport(Transport):
+        def capture_envelope(self, envelope):
+            pass
+
+    if mode == "full":
+        sentry_sdk.init(
+            dsn="https://key@localhost/1",
+            traces_sample_rate=1.0,
+            transport=DroppingTransport,
+        )
+    elif mode == "sampler":
+        init_sentry(app, transport=DroppingTransport)
+
+    headers = {"Authorization": f"Bearer {generate_access_token(1)}"}
+    results = {}
+    for route, path in ROUTES.items():
+        asyncio.run(measure(path, headers, warmup))
+        results[route] = asyncio.run(measure(path, headers, duration)) * 1e6
+    if mode == "sampler":
+        results["sampler"] = trace_sampler.stats()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per route")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.warmup, args.duration)))
+        return
+
+    from benchmarks.load import CORE_DIR, seed
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tracing.db')}"
+    seed(url, users=1, tasks=200)
+    env = {
+        **os.environ,
+        "SQLALCHEMY_DATABASE_URL": url,
+        "SENTRY_DSN": "https://key@localhost/1",
+        "TASK_CACHE_BACKEND": "memory",
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    results = {}
+    for mode in MODES:
+        output = subprocess.check_output(
+            [
+                sys.executable, "-m", "benchmarks.tracing", "--mode", mode,
+                "--duration", str(args.duration), "--warmup", str(args.warmup),
+            ],
+            cwd=CORE_DIR,
+            env=env,
+            text=True,
+        )
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'route':<16}" + "".join(f"{mode + ' us':>14}" for mode in MODES))
+    for route in ROUTES:
+        print(f"{route:<16}" + "".join(f"{results[m][route]:>14.1f}" for m in MODES))
+    for route in ROUTES:
+        off = results["off"][route]
+        print(
+            f"{route} overhead: full +{results['full'][route] - off:.1f} us, "
+            f"sampler +{results['sampler'][route] - off:.1f} us"
+        )
+    print(f"sampler {results['sampler']['sampler']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import logging
+import math
+import time
+import orjson
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+from auth.jwt_auth import verify_token
+from core.cache import TTLCache
+from core.config import settings
+from core.metrics import match_route
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ADMISSION = Counter(
+    "http_admission_decisions_total",
+    "Admission control outcome per route template",
+    ["decision", "route"],
+)
+RATE_LIMIT_FALLBACKS = Counter(
+    "http_rate_limit_fallbacks_total",
+    "Rate limit checks answered in process because redis failed",
+)
+
+# refill, take one token and report the wait for the next one, atomically;
+# redis' own clock is used so workers with skewed clocks agree
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+class TokenBucketLimiter:
+    """Per identity and route token buckets, in redis or in process.
+
+    Each route template gets `routes[template]` or the default (rate per
+    second, burst). Redis keeps the buckets shared by all workers; while it
+    fails, and for `retry_after` seconds after, buckets are kept per process
+    instead, which at worst multiplies the limit by the number of workers.
+    """
+
+    key_prefix = "ratelimit:"
+    retry_after = 5
+
+    def __init__(
+        self,
+        default: tuple,
+        routes: dict,
+        use_redis: bool,
+        enabled: bool = True,
+        maxsize: int = 100000,
+    ):
+        self.default = tuple(default)
+        self.routes = {route: tuple(limit) for route, limit in routes.items()}
+        self.use_redis = use_redis
+        self.enabled = enabled
+        self.local = TTLCache(maxsize=maxsize, ttl=60)
+        self._script = None
+        self._unavailable_until = 0.0
+
+    def limit_for(self, route: str) -> tuple:
+        return self.routes.get(route, self.default)
+
+    async def hit(self, identity: str, route: str):
+        """Takes a token, returns (allowed, seconds until the next token)."""
+        rate, burst = self.limit_for(route)
+        key = f"{self.key_prefix}{route}:{identity}"
+        if self.use_redis and time.monotonic() >= self._unavailable_until:
+            try:
+                if self._script is None:
+                    self._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+                allowed, wait = await self._script(keys=[key], args=[rate, burst])
+                return bool(allowed), float(wait)
+            except (RedisError, OSError) as e:
+                self._unavailable_until = time.monotonic() + self.retry_after
+                logger.warning("rate limit redis failed, limiting in process: %s", e)
+        if self.use_redis:
+            # the failed call and every check during the backoff after it
+            RATE_LIMIT_FALLBACKS.inc()
+        return self._local_hit(key, rate, burst)
+
+    def _local_hit(self, key: str, rate: float, burst: int):
+        now = time.monotonic()
+        tokens, ts = self.local.get(key) or (burst, now)
+        tokens = min(burst, tokens + (now - ts) * rate)
+        if tokens >= 1:
+            allowed, wait, tokens = True, 0.0, tokens - 1
+        else:
+            allowed, wait = False, (1 - tokens) / rate
+        self.local.set(key, (tokens, now), ttl=burst / rate + 1)
+        return allowed, wait
+
+
+rate_limiter = TokenBucketLimiter(
+    default=(settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST),
+    routes=settings.RATE_LIMIT_ROUTES,
+    use_redis=settings.RATE_LIMIT_BACKEND == "redis",
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
+
+
+def client_identity(scope) -> str:
+    """The user id of a valid bearer jwt, otherwise the client address.
+
+    Only the claims cache is consulted, no database; unverifiable
+    credentials are limited by address so made up tokens get no fresh bucket.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    return f"user:{verify_token(token, 'access')}"
+                except Exception:
+                    pass
+            break
+    client = scope.get("client")
+    return f"addr:{client[0] if client else 'unknown'}"
+
+
+class AdmissionMiddleware:
+    """Sheds load before it reaches the handlers.
+
+    Past `max_concurrency` requests in flight on this worker new requests get
+    an immediate 503 instead of queueing on the database pool or the bcrypt
+    threads; after that the caller's token bucket for the route is charged
+    and an empty bucket answers 429. Both carry Retry-After.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_concurrency: int = None,
+        limiter: TokenBucketLimiter = None,
+        skip_paths=("/metrics", "/is_ready"),
+        skip_prefixes=("/internal/",),
+    ):
+        self.app = app
+        self.max_concurrency = (
+            settings.ADMISSION_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        )
+        self.limiter = limiter or rate_limiter
+        self.skip_paths = frozenset(skip_paths)
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.in_flight = 0
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float):
+        body = orjson.dumps({"error": True, "status_code": status, "detail": detail})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or path in self.skip_paths
+            or path.startswith(self.skip_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # routing has not run yet, so the template is looked up here
+        route = match_route(scope["app"].router, scope)
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            ADMISSION.labels("shed", route).inc()
+            await self._reject(
+                send, 503, "Server is busy, try again shortly", settings.ADMISSION_RETRY_AFTER
+            )
+            return
+
+        self.in_flight += 1
+        try:
+            if self.limiter.enabled and scope["method"] != "OPTIONS":
+                allowed, wait = await self.limiter.hit(client_identity(scope), route)
+                if not allowed:
+                    ADMISSION.labels("rate_limited", route).inc()
+                    await self._reject(send, 429, "Too many requests", wait)
+                    return
+            ADMISSION.labels("admitted", route).inc()
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
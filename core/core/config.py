@@ -3,9 +3,34 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     SQLALCHEMY_DATABASE_URL: str = "sqlite:///:memory:"
+    # derived from SQLALCHEMY_DATABASE_URL when left empty
+    SQLALCHEMY_ASYNC_DATABASE_URL: str = ""
+    # optional read replica for read only routes; a user who wrote reads from
+    # the primary for REPLICA_STICKY_SECONDS, keep it above the replication lag
+    SQLALCHEMY_REPLICA_DATABASE_URL: str = ""
+    REPLICA_STICKY_SECONDS: float = 5.0
+    REPLICA_STICKY_REDIS: bool = True
+    # per engine and per process; size against the number of workers
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # connect the pool and compile the hot statements before serving
+    DB_WARMUP: bool = True
     JWT_SECRET_KEY: str = "test"
     REDIS_URL: str = "redis://redis:6379" 
     SENTRY_DSN: str = "https://510f351ab74577b51357b71d4f7c3ab6@sentry.hamravesh.com/8051"
+    # sentry tracing: each worker traces about TRACES_PER_SECOND requests,
+    # down-sampling its hottest routes first; a 5xx or a request slower than
+    # TRACES_SLOW_SECONDS traces its route fully for TRACES_BOOST_SECONDS
+    TRACES_PER_SECOND: float = 2.0
+    TRACES_MIN_RATE: float = 0.001
+    TRACES_SLOW_SECONDS: float = 1.0
+    TRACES_BOOST_SECONDS: float = 60.0
+    # fixed rates per route template, and for transactions outside requests
+    TRACES_ROUTE_RATES: dict[str, float] = {"/is_ready": 0.0, "/metrics": 0.0}
+    TRACES_DEFAULT_RATE: float = 0.1
 
 
     MAIL_USERNAME: str = ""
@@ -17,6 +42,77 @@ class Settings(BaseSettings):
     MAIL_STARTTLS: bool = False
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = False
+    # outbox: SMTP sessions kept open by the senders, retries with backoff;
+    # queued mail is held in memory only and lost on restart or worker recycle
+    MAIL_SENDERS: int = 2
+    MAIL_OUTBOX_SIZE: int = 1000
+    MAIL_MAX_PER_CONNECTION: int = 100
+    MAIL_IDLE_TIMEOUT: float = 30.0
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BACKOFF: float = 1.0
+
+    # verified jwt claims, each kept until its token expires
+    JWT_CLAIMS_CACHE_SIZE: int = 10000
+
+    # authenticated principal cache (seconds / entries)
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_REDIS: bool = False
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300
+
+    # opaque api tokens: digest -> user id, local entries outlive a revoke on
+    # other workers by at most TOKEN_CACHE_TTL seconds
+    TOKEN_CACHE_TTL: int = 10
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_REDIS: bool = True
+    TOKEN_CACHE_REDIS_TTL: int = 60
+
+    # bcrypt runs on its own pool, beyond MAX_PENDING calls logins get a 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    BASIC_AUTH_CACHE_TTL: int = 60
+    BASIC_AUTH_CACHE_SIZE: int = 10000
+
+    # per-user cache of task list/detail responses, backend "redis" or "memory"
+    TASK_CACHE_ENABLED: bool = True
+    TASK_CACHE_BACKEND: str = "redis"
+    TASK_CACHE_TTL: int = 60
+
+    # durable job queue in the jobs table, run by `python -m jobs.worker`
+    JOBS_CONCURRENCY: int = 4
+    JOBS_POLL_INTERVAL: float = 1.0
+    JOBS_VISIBILITY_TIMEOUT: float = 60.0
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_RETRY_BACKOFF: float = 5.0
+    # also run a worker inside each API process, for single container setups
+    JOBS_EMBEDDED_WORKER: bool = False
+
+    # /fetch-current-weather: fresh for FRESH_TTL, then served stale for up to
+    # STALE_TTL more while refreshing; coordinates rounded to PRECISION decimals
+    WEATHER_API_URL: str = "https://api.open-meteo.com"
+    WEATHER_FRESH_TTL: float = 10.0
+    WEATHER_STALE_TTL: float = 60.0
+    WEATHER_COORD_PRECISION: int = 2
+    WEATHER_TIMEOUT: float = 5.0
+
+    # admission control: requests in flight per worker before shedding with
+    # 503 (0 disables), then per user/address and route token buckets
+    ADMISSION_MAX_CONCURRENCY: int = 256
+    ADMISSION_RETRY_AFTER: int = 1
+    RATE_LIMIT_ENABLED: bool = True
+    # "redis" shares buckets between workers, "memory" keeps them per process
+    RATE_LIMIT_BACKEND: str = "redis"
+    # tokens per second and burst, overridable per route template
+    RATE_LIMIT_RATE: float = 20.0
+    RATE_LIMIT_BURST: int = 60
+    RATE_LIMIT_ROUTES: dict[str, tuple[float, int]] = {
+        "/users/login": (0.5, 10),
+        "/users/register": (0.2, 5),
+        "/users/refresh-token": (1.0, 10),
+    }
+
+    # X-Internal-Token for /internal endpoints, which are disabled while empty
+    INTERNAL_API_TOKEN: str = ""
     
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,14 +1,165 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import time
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlalchemy import create_engine, Insert, Update, Delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from core.cache import TTLCache
 from core.config import settings
+from core.pool import pool_options, instrument_engine
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# async drivers used for each sync dialect we ship with
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Translates a sync database url into its async driver equivalent."""
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for '{backend}'")
+    return url_obj.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
 
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URL,
     # connect_args={"check_same_thread": False},  # only for sqlite
+    **pool_options(settings.SQLALCHEMY_DATABASE_URL),
 )
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = settings.SQLALCHEMY_ASYNC_DATABASE_URL or to_async_url(
+    settings.SQLALCHEMY_DATABASE_URL
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, asynchronous=True)
+)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+class ReplicaRoutingSession(Session):
+    """Sends reads to the replica and writes, flushes and pinned users' reads
+    to the primary; both engines come in through the session info.
+
+    A write pins the session, so it goes on reading its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["pinned"] = True
+        if self.info.get("pinned"):
+            return self.info["primary"]
+        return self.info["replica"]
+
+
+def replica_sessionmaker(primary, replica) -> async_sessionmaker:
+    return async_sessionmaker(
+        sync_session_class=ReplicaRoutingSession,
+        info={
+            "primary": primary.sync_engine,
+            "replica": replica.sync_engine,
+            "routed": True,
+        },
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+# read only routes use AsyncReadSessionLocal, the primary's sessions when no
+# replica is configured
+replica_async_engine = None
+AsyncReadSessionLocal = AsyncSessionLocal
+if settings.SQLALCHEMY_REPLICA_DATABASE_URL:
+    REPLICA_ASYNC_DATABASE_URL = to_async_url(settings.SQLALCHEMY_REPLICA_DATABASE_URL)
+    replica_async_engine = create_async_engine(
+        REPLICA_ASYNC_DATABASE_URL,
+        **pool_options(REPLICA_ASYNC_DATABASE_URL, asynchronous=True),
+    )
+    instrument_engine(replica_async_engine.sync_engine)
+    AsyncReadSessionLocal = replica_sessionmaker(async_engine, replica_async_engine)
+
+
+class ReadYourWrites:
+    """Users who just wrote, whose reads stay on the primary for a while.
+
+    A pin lasts `ttl` seconds, which has to cover the replication lag. It is
+    kept in process and in redis so every worker honours it; while redis
+    fails, and for `retry_after` seconds after, only the worker that took
+    the write knows about the pin.
+    """
+
+    key_prefix = "pinned:"
+    retry_after = 5
+
+    def __init__(self, ttl: float, use_redis: bool, maxsize: int = 100000):
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.pins = 0
+        self.pinned_reads = 0
+        self._unavailable_until = 0.0
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._unavailable_until
+
+    def _redis_failed(self, e: Exception) -> None:
+        self._unavailable_until = time.monotonic() + self.retry_after
+        logger.warning("read-your-writes redis failed: %s", e)
+
+    async def pin(self, user_id: int) -> None:
+        self.pins += 1
+        self.local.set(user_id, True)
+        if not self._redis_available():
+            return
+        try:
+            await get_redis().set(
+                f"{self.key_prefix}{user_id}", 1, px=int(self.ttl * 1000)
+            )
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    async def is_pinned(self, user_id: int) -> bool:
+        pinned = self.local.get(user_id) is not None
+        if not pinned and self._redis_available():
+            try:
+                pinned = bool(await get_redis().exists(f"{self.key_prefix}{user_id}"))
+            except (RedisError, OSError) as e:
+                self._redis_failed(e)
+        if pinned:
+            self.pinned_reads += 1
+        return pinned
+
+    def stats(self) -> dict:
+        return {
+            "pins": self.pins,
+            "pinned_reads": self.pinned_reads,
+            "size": len(self.local),
+        }
+
+
+read_your_writes = ReadYourWrites(
+    ttl=settings.REPLICA_STICKY_SECONDS, use_redis=settings.REPLICA_STICKY_REDIS
+)
+
+# requests that can not have written anything
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
 
 # create base class for declaring tables
 Base = declarative_base()
@@ -20,3 +171,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        yield db
+        # runs before the response is sent, so the next read is pinned already
+        user_id = getattr(request.state, "user_id", None)
+        if user_id is not None and request.method not in SAFE_METHODS:
+            await pin_writer(user_id)
+
+
+async def pin_writer(user_id: int) -> None:
+    """Pins a user who just wrote, a no-op without a replica to lag behind."""
+    if replica_async_engine is not None:
+        await read_your_writes.pin(user_id)
+
+
+async def get_async_read_db():
+    """Session for read only routes, routed to the replica when there is one."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def remember_user(request: Request, db, user_id: int) -> None:
+    """Called by authentication with the user it resolved from a request.
+
+    Writes of the request pin the user to the primary, see get_async_db,
+    and a pinned user's reads on a routed session go to the primary too.
+    """
+    request.state.user_id = user_id
+    if db.info.get("routed") and await read_your_writes.is_pinned(user_id):
+        db.info["pinned"] = True
+
+
+def read_from_primary(db) -> None:
+    """Sends the session's further reads to the primary.
+
+    For lookups whose results are cached beyond the request: a stale replica
+    would keep revoked tokens or old credentials in the caches.
+    """
+    if db.info.get("routed"):
+        db.info["pinned"] = True
+
+
+def get_async_session_factory():
+    """For work outliving the request scoped session, e.g. streamed responses."""
+    return AsyncSessionLocal
@@ -1,28 +1,227 @@
 # app/email_util.py
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+import asyncio
+import logging
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+import aiosmtplib
+from fastapi import HTTPException, status
 from core.config import settings
 
-# Email Configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMail:
+    message: EmailMessage
+    attempts: int = 0
+
+
+class Outbox:
+    """Queue of outgoing mail drained by a few long lived SMTP sessions.
+
+    send_email only enqueues. Each sender keeps its SMTP connection open
+    while mail keeps coming, sends up to `max_per_connection` messages on it
+    and closes it after `idle_timeout` seconds without mail. A message that
+    fails with a temporary error is retried with exponential backoff, up to
+    `max_attempts` times; permanent (5xx) rejections and messages that can
+    not be sent at all are dropped right away.
+
+    The queue lives in process memory: mail still queued or waiting for a
+    retry is lost when the process exits or the worker is recycled.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        senders: int = 2,
+        maxsize: int = 1000,
+        max_per_connection: int = 100,
+        idle_timeout: float = 30.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 1.0,
+        **smtp_options,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.senders = senders
+        self.maxsize = maxsize
+        self.max_per_connection = max_per_connection
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.smtp_options = smtp_options
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.connections = 0
+        self._queue = None
+        self._loop = None
+        self._idle = None
+        self._unfinished = 0
+        self._tasks = []
+        self._retries = set()
+
+    def start(self) -> None:
+        """Starts the senders on the running loop; enqueue() does it lazily."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(self.maxsize)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._unfinished = 0
+        self._tasks = [
+            asyncio.create_task(self._sender()) for _ in range(self.senders)
+        ]
+
+    def enqueue(self, message: EmailMessage) -> None:
+        self.start()
+        try:
+            self._queue.put_nowait(OutgoingMail(message))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many outgoing emails, try again shortly",
+                headers={"Retry-After": "5"},
+            )
+        self._unfinished += 1
+        self._idle.clear()
+
+    def pending(self) -> int:
+        """Messages queued, being sent or waiting for a retry."""
+        return self._unfinished
+
+    async def flush(self, timeout: float = None) -> None:
+        """Waits until every queued message was sent or given up on."""
+        if self._queue is not None:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Flushes for at most `timeout` seconds, then closes the senders."""
+        if self._queue is None:
+            return
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning("outbox stopped with %d unsent emails", self.pending())
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks, self._retries = [], set()
+        self._queue = self._loop = self._idle = None
+        self._unfinished = 0
+
+    def _connection(self) -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(hostname=self.hostname, port=self.port, **self.smtp_options)
+
+    async def _sender(self) -> None:
+        smtp = None
+        sent_on_connection = 0
+        try:
+            while True:
+                try:
+                    if smtp is None:
+                        mail = await self._queue.get()
+                    else:
+                        mail = await asyncio.wait_for(
+                            self._queue.get(), self.idle_timeout
+                        )
+                except asyncio.TimeoutError:
+                    smtp = await self._close(smtp)
+                    continue
+
+                try:
+                    if smtp is None or sent_on_connection >= self.max_per_connection:
+                        await self._close(smtp)
+                        smtp = self._connection()
+                        await smtp.connect()
+                        self.connections += 1
+                        sent_on_connection = 0
+                    await smtp.send_message(mail.message)
+                    sent_on_connection += 1
+                    self.sent += 1
+                    self._settled()
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    smtp = await self._close(smtp)
+                    self._failed(mail, e)
+                except Exception:
+                    # a malformed message must not take the sender down with it
+                    logger.exception("dropping email to %s", mail.message["To"])
+                    smtp = await self._close(smtp)
+                    self.failed += 1
+                    self._settled()
+        finally:
+            await self._close(smtp)
+
+    async def _close(self, smtp):
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                smtp.close()
+        return None
+
+    def _failed(self, mail: OutgoingMail, error: Exception) -> None:
+        mail.attempts += 1
+        permanent = isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+        if permanent or mail.attempts >= self.max_attempts:
+            self.failed += 1
+            logger.error(
+                "giving up on email to %s after %d attempts: %s",
+                mail.message["To"], mail.attempts, error,
+            )
+            self._settled()
+            return
+        self.retried += 1
+        delay = self.retry_backoff * 2 ** (mail.attempts - 1)
+        task = asyncio.create_task(self._retry_later(mail, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    def _settled(self) -> None:
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._idle.set()
+
+    async def _retry_later(self, mail: OutgoingMail, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._queue.put(mail)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "connections": self.connections,
+        }
+
+
+outbox = Outbox(
+    hostname=settings.MAIL_SERVER,
+    port=settings.MAIL_PORT,
+    senders=settings.MAIL_SENDERS,
+    maxsize=settings.MAIL_OUTBOX_SIZE,
+    max_per_connection=settings.MAIL_MAX_PER_CONNECTION,
+    idle_timeout=settings.MAIL_IDLE_TIMEOUT,
+    max_attempts=settings.MAIL_MAX_ATTEMPTS,
+    retry_backoff=settings.MAIL_RETRY_BACKOFF,
+    username=settings.MAIL_USERNAME if settings.USE_CREDENTIALS else None,
+    password=settings.MAIL_PASSWORD if settings.USE_CREDENTIALS else None,
+    use_tls=settings.MAIL_SSL_TLS,
+    start_tls=settings.MAIL_STARTTLS,
 )
 
+
 # Function to send an email
 async def send_email(subject: str, recipients: list[str], body: str):
-    message = MessageSchema(
-        subject=subject,
-        recipients=recipients,
-        body=body,
-        subtype="plain"
-    )
-
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    """Queues a plain text email; it is sent in the background by the outbox."""
+    message = EmailMessage()
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body)
+    outbox.enqueue(message)
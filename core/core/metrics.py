@@ -0,0 +1,132 @@
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+# With PROMETHEUS_MULTIPROC_DIR set every worker process writes its samples to
+# mmap'ed files in that directory and /metrics aggregates all of them, so a
+# scrape sees the whole server and not just the worker that answered it.
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# requests that matched no route share one label instead of one per url
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by route template and response status",
+    ["method", "route", "status"],
+)
+EXCEPTIONS = Counter(
+    "http_request_exceptions_total",
+    "Requests that raised instead of returning a response",
+    ["method", "route"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its last body chunk",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+# called with (method, route, status, seconds) after every request,
+# e.g. by the trace sampler in core.sentry
+request_listeners = []
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or UNMATCHED_ROUTE
+
+
+def match_route(router, scope) -> str:
+    """The template of the route a scope will match, before routing ran."""
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path_format", scope["path"])
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware feeding the request metrics.
+
+    It also sets X-Process-Time (seconds until the response headers), which
+    the app used to add from a BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [
+                    *message["headers"],
+                    (b"x-process-time", str(time.perf_counter() - start).encode()),
+                ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            EXCEPTIONS.labels(scope["method"], route_template(scope)).inc()
+            raise
+        finally:
+            IN_FLIGHT.dec()
+            method, route = scope["method"], route_template(scope)
+            duration = time.perf_counter() - start
+            REQUESTS.labels(method, route, str(status)).inc()
+            LATENCY.labels(method, route).observe(duration)
+            RESPONSE_SIZE.labels(method, route).observe(size)
+            for listener in request_listeners:
+                listener(method, route, status, duration)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,146 @@
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from core.config import settings
+
+# upper bounds in milliseconds of the checkout wait histogram
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats:
+    """Counters of one engine's pool, kept across pool recreation."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.wait_buckets[i] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    def as_dict(self) -> dict:
+        waits = sum(self.wait_buckets)
+        buckets = {f"le_{bound}ms": n for bound, n in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+        buckets[f"gt_{WAIT_BUCKETS_MS[-1]}ms"] = self.wait_buckets[-1]
+        return {
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "overflow_checkouts": self.overflow_checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": self.wait_total / waits * 1000 if waits else 0.0,
+            "wait_ms_max": self.wait_max * 1000,
+            "wait_ms_buckets": buckets,
+        }
+
+
+class InstrumentedPoolMixin:
+    """Times every wait for a connection and counts overflow and timeouts.
+
+    The pool has no event before a checkout starts waiting, so the wait is
+    measured around _do_get, the one place a checkout can block.
+    """
+
+    pool_stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.pool_stats.timeouts += 1
+            raise
+        finally:
+            self.pool_stats.record_wait(time.perf_counter() - start)
+        if self.checkedout() > self.size():
+            self.pool_stats.overflow_checkouts += 1
+        return record
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool, the counters carry over
+        pool = super().recreate()
+        pool.pool_stats = self.pool_stats
+        return pool
+
+    def status_dict(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            **self.pool_stats.as_dict(),
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, asynchronous: bool = False) -> dict:
+    """create_engine keyword arguments sizing the pool from settings.
+
+    In memory sqlite is left alone, it needs its single connection pool.
+    """
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() == "sqlite" and url_obj.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def instrument_engine(engine) -> None:
+    """Attaches PoolStats to the engine's pool and counts pool events."""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPoolMixin):
+        return
+    stats = pool.pool_stats = PoolStats()
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedPoolMixin):
+        return pool.status_dict()
+    return {"pool": type(pool).__name__, "status": pool.status()}
@@ -0,0 +1,22 @@
+import redis
+from redis import asyncio as aioredis
+from core.config import settings
+
+_redis = None
+_sync_redis = None
+
+
+def get_redis():
+    """Returns the shared async redis client, created on first use."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+def get_sync_redis():
+    """Returns a blocking redis client for code running outside the event loop."""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL)
+    return _sync_redis
@@ -0,0 +1,152 @@
+import time
+from collections import defaultdict
+from core.config import settings
+from core.metrics import match_route, request_listeners
+
+
+def budget_rates(rps: dict, budget: float, min_rate: float) -> dict:
+    """Sampling rate per route so that about `budget` requests/s are traced.
+
+    Every route may trace up to the same share of the budget; routes below
+    it keep all their requests and leave the rest to the hotter ones, which
+    are down-sampled to that share but never below `min_rate`.
+    """
+    rates = {}
+    remaining = budget
+    by_rate = sorted(rps.items(), key=lambda item: item[1])
+    for i, (route, rate) in enumerate(by_rate):
+        share = remaining / (len(by_rate) - i)
+        if rate <= share:
+            rates[route] = 1.0
+            remaining -= rate
+        else:
+            rates[route] = max(min_rate, share / rate)
+            remaining -= share
+    return rates
+
+
+class TraceSampler:
+    """Sentry traces_sampler keeping tracing within a per process budget.
+
+    Request rates per route template, fed by MetricsMiddleware, are turned
+    into sampling rates every `interval` seconds with budget_rates, so hot
+    healthy routes are down-sampled and rare ones stay fully traced. A 5xx
+    or a request slower than `slow_seconds` traces its route fully for
+    `boost_seconds`. Error events are sent whatever the sampling decision.
+    `route_rates` pins the rate of a route, e.g. 0 for health checks.
+    """
+
+    interval = 1.0
+
+    def __init__(
+        self,
+        per_second: float,
+        min_rate: float,
+        slow_seconds: float,
+        boost_seconds: float,
+        route_rates: dict,
+        default_rate: float,
+    ):
+        self.per_second = per_second
+        self.min_rate = min_rate
+        self.slow_seconds = slow_seconds
+        self.boost_seconds = boost_seconds
+        self.route_rates = dict(route_rates)
+        self.default_rate = default_rate
+        self.router = None
+        self.rates = {}
+        self.boosted = {}
+        self.decisions = 0
+        self.expected_sampled = 0.0
+        self._counts = defaultdict(int)
+        self._window_start = time.monotonic()
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        now = time.monotonic()
+        self._counts[route] += 1
+        if status >= 500 or seconds >= self.slow_seconds:
+            self.boosted[route] = now + self.boost_seconds
+        if now - self._window_start >= self.interval:
+            self._adjust(now)
+
+    def _adjust(self, now: float) -> None:
+        elapsed = now - self._window_start
+        # pinned routes never spend the budget, so they get no share of it
+        rps = {
+            route: n / elapsed
+            for route, n in self._counts.items()
+            if route not in self.route_rates
+        }
+        # routes idle during the window start over fully sampled
+        self.rates = budget_rates(rps, self.per_second, self.min_rate)
+        self.boosted = {r: until for r, until in self.boosted.items() if until > now}
+        self._counts.clear()
+        self._window_start = now
+
+    def rate_for(self, route: str) -> float:
+        if route in self.route_rates:
+            return self.route_rates[route]
+        if self.boosted.get(route, 0.0) > time.monotonic():
+            return 1.0
+        return self.rates.get(route, 1.0)
+
+    def __call__(self, sampling_context: dict) -> float:
+        scope = sampling_context.get("asgi_scope")
+        if scope is None or scope.get("type") != "http" or self.router is None:
+            rate = self.default_rate
+        else:
+            # routing has not run yet when the transaction starts
+            route = match_route(self.router, scope)
+            parent = sampling_context.get("parent_sampled")
+            if route not in self.route_rates and parent is not None:
+                # keep traces started by an upstream service whole
+                rate = float(parent)
+            else:
+                rate = self.rate_for(route)
+        self.decisions += 1
+        self.expected_sampled += rate
+        return rate
+
+    def stats(self) -> dict:
+        return {
+            "per_second": self.per_second,
+            "decisions": self.decisions,
+            "expected_sampled": round(self.expected_sampled),
+            "rates": {route: round(rate, 4) for route, rate in self.rates.items()},
+            "boosted": sorted(self.boosted),
+        }
+
+
+trace_sampler = TraceSampler(
+    per_second=settings.TRACES_PER_SECOND,
+    min_rate=settings.TRACES_MIN_RATE,
+    slow_seconds=settings.TRACES_SLOW_SECONDS,
+    boost_seconds=settings.TRACES_BOOST_SECONDS,
+    route_rates=settings.TRACES_ROUTE_RATES,
+    default_rate=settings.TRACES_DEFAULT_RATE,
+)
+
+
+def init_sentry(app, **options) -> bool:
+    """Starts this process' Sentry client, a no-op while SENTRY_DSN is empty.
+
+    Called from the lifespan rather than at import, so importing the app
+    (alembic, the gunicorn master, tests that skip the lifespan) does not
+    load sentry_sdk, and each forked worker starts its own transport thread.
+    The test suite clears SENTRY_DSN, so lifespans it runs stay offline.
+    `options` go to sentry_sdk.init as they are.
+    """
+    if not settings.SENTRY_DSN:
+        return False
+    import sentry_sdk
+
+    if not sentry_sdk.get_client().is_active():
+        trace_sampler.router = app.router
+        if trace_sampler.observe not in request_listeners:
+            request_listeners.append(trace_sampler.observe)
+        sentry_sdk.init(
+            dsn=settings.SENTRY_DSN,
+            traces_sampler=trace_sampler,
+            **options,
+        )
+    return True
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from sqlalchemy import select, text
+from sqlalchemy.pool import QueuePool
+from users.models import UserModel
+from tasks.models import TaskModel
+from tasks.serializers import TASK_COLUMNS
+from tasks.stats import get_stats
+
+logger = logging.getLogger(__name__)
+
+
+def hot_statements(user_id: int = 0) -> list:
+    """The statements behind auth, task list and task detail, in the shape
+    the request paths build them; parameters are not part of the cache key.
+    """
+    return [
+        select(UserModel.id, UserModel.username, UserModel.is_active).filter_by(
+            id=user_id
+        ),
+        select(*TASK_COLUMNS)
+        .filter_by(user_id=user_id)
+        .order_by(TaskModel.id)
+        .offset(0)
+        .limit(11),
+        select(*TASK_COLUMNS).filter_by(user_id=user_id, id=0),
+    ]
+
+
+async def fill_pool(engine) -> int:
+    """Opens as many connections as the pool keeps, all at once."""
+    pool = engine.sync_engine.pool
+    size = pool.size() if isinstance(pool, QueuePool) else 1
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(size)), return_exceptions=True
+    )
+    try:
+        for connection in connections:
+            if isinstance(connection, BaseException):
+                raise connection
+            await connection.execute(text("SELECT 1"))
+    finally:
+        await asyncio.gather(
+            *(c.close() for c in connections if not isinstance(c, BaseException))
+        )
+    return size
+
+
+async def warm_up(engine, session_factory) -> None:
+    """Connects the pool and compiles the hot statements before serving.
+
+    The server only accepts requests once the lifespan startup is done, so
+    the first requests of a fresh worker neither wait for connects nor pay
+    for SQL compilation. A database that is down is logged, not fatal: the
+    pool connects lazily again once it is back.
+    """
+    start = time.perf_counter()
+    try:
+        connections = await fill_pool(engine)
+        async with session_factory() as db:
+            for statement in hot_statements():
+                await db.execute(statement)
+            await get_stats(db, 0)
+    except Exception as e:
+        logger.warning("database warm-up failed, starting cold: %s", e)
+        return
+    logger.info(
+        "warmed up %d connections in %.1f ms",
+        connections, (time.perf_counter() - start) * 1000,
+    )
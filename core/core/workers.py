@@ -0,0 +1,73 @@
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: affinity mask and cgroup quota, not the host."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2, "max 100000" when unlimited
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def worker_count(
+    configured: int = 0, per_core: float = 1.0, minimum: int = 2, maximum: int = 0
+) -> int:
+    """An explicit count wins; otherwise cpus * per_core within the bounds."""
+    if configured > 0:
+        return configured
+    workers = max(minimum, math.ceil(available_cpus() * per_core))
+    return min(workers, maximum) if maximum > 0 else workers
+
+
+def reset_after_fork(workers: int) -> None:
+    """Drops state a preloaded app inherited from the master process.
+
+    Pooled connections must never be shared between processes, and caches
+    filled in the master would be served by every worker.
+    """
+    from core.database import (
+        engine,
+        async_engine,
+        replica_async_engine,
+        read_your_writes,
+    )
+    from core import redis_client
+    from auth.hashing import password_hasher
+    from auth.principal import principal_cache
+    from auth.jwt_auth import claims_cache
+    from auth.basic_auth import verified_credentials
+    from auth.token_auth import token_cache
+    from tasks.cache import task_cache, MemoryCacheBackend
+
+    # close=False leaves the master's sockets alone, the worker just forgets them
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if replica_async_engine is not None:
+        replica_async_engine.sync_engine.dispose(close=False)
+    redis_client._redis = None
+    redis_client._sync_redis = None
+    password_hasher._executor = None
+
+    principal_cache.clear()
+    claims_cache.clear()
+    verified_credentials.clear()
+    token_cache.local.clear()
+    read_your_writes.local.clear()
+
+    if workers > 1 and isinstance(task_cache.backend, MemoryCacheBackend):
+        # invalidations would only reach the worker that made the write
+        logger.warning("task cache disabled: the memory backend is per process")
+        task_cache.enabled = False
@@ -2,6 +2,7 @@ from core.database import SessionLocal
 from sqlalchemy.orm import Session
 from users.models import UserModel
 from tasks.models import TaskModel
+from tasks.stats import rebuild_stats_statements
 from faker import Faker
 
 
@@ -30,6 +31,9 @@ def seed_tasks(db, user, count=10):
             )
         )
     db.add_all(tasks_list)
+    db.flush()
+    for statement in rebuild_stats_statements(user.id):
+        db.execute(statement)
     db.commit()
     print(f"added 10 tasks for user id {user.id}")
 
@@ -0,0 +1,59 @@
+"""Production serving: gunicorn pre-forking uvicorn workers.
+
+    gunicorn -c gunicorn_conf.py main:app
+
+WEB_CONCURRENCY sets the worker count; when unset it is derived from the
+CPUs available to the container (WORKERS_PER_CORE, MIN_WORKERS, MAX_WORKERS).
+"""
+
+import os
+import shutil
+
+from core.workers import reset_after_fork, worker_count
+
+# has to be set before prometheus_client is imported by the preloaded app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = worker_count(
+    configured=int(os.getenv("WEB_CONCURRENCY", "0")),
+    per_core=float(os.getenv("WORKERS_PER_CORE", "1")),
+    minimum=int(os.getenv("MIN_WORKERS", "2")),
+    maximum=int(os.getenv("MAX_WORKERS", "0")),
+)
+
+# import the app, its routers and orm mappers once, then fork
+preload_app = True
+
+# recycle workers to bound slow leaks; the jitter keeps them from all
+# restarting at the same moment
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# in-flight requests get this long after SIGTERM, lifespan shutdown included
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    # metric files of an earlier run would be summed into /metrics; the
+    # master's own files from preloading are never read, it serves nothing
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def post_fork(server, worker):
+    reset_after_fork(server.cfg.workers)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,60 @@
+import os
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException
+from core.config import settings
+from core.database import engine, async_engine, replica_async_engine, read_your_writes
+from core.pool import pool_status
+from core.email_util import outbox
+from core.sentry import trace_sampler
+from weather.service import weather_service
+from auth.principal import principal_cache
+from auth.jwt_auth import claims_cache
+from auth.token_auth import token_cache
+from auth.hashing import password_hasher
+from tasks.cache import task_cache
+
+
+def require_internal_token(x_internal_token: str = Header(None)):
+    """Internal endpoints answer 404 unless INTERNAL_API_TOKEN is set and sent."""
+    if not settings.INTERNAL_API_TOKEN or not secrets.compare_digest(
+        (x_internal_token or "").encode(), settings.INTERNAL_API_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+router = APIRouter(
+    tags=["internal"],
+    prefix="/internal",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/stats")
+async def internal_stats():
+    """Runtime counters of this worker process."""
+    return {
+        "pid": os.getpid(),
+        "database": {
+            "sync": pool_status(engine),
+            "async": pool_status(async_engine.sync_engine),
+            "replica": (
+                pool_status(replica_async_engine.sync_engine)
+                if replica_async_engine is not None
+                else None
+            ),
+        },
+        "read_your_writes": read_your_writes.stats(),
+        "jwt_claims_cache": claims_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "task_cache": task_cache.stats(),
+        "outbox": outbox.stats(),
+        "weather": weather_service.stats(),
+        "trace_sampler": trace_sampler.stats(),
+        "password_hasher": {
+            "workers": password_hasher.workers,
+            "pending": password_hasher.pending,
+            "rejected": password_hasher.rejected,
+        },
+    }
@@ -0,0 +1,14 @@
+import asyncio
+import random
+import logging
+from jobs.registry import job
+
+logger = logging.getLogger(__name__)
+
+
+@job("start_task")
+async def start_task(task_id: int):
+    logger.info("doing the process: %s", task_id)
+    await asyncio.sleep(random.randint(3, 10))
+    logger.info("finished task %s", task_id)
+    return {"task_id": task_id}
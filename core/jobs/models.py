@@ -0,0 +1,37 @@
+from sqlalchemy import (
+    Column,
+    String,
+    Text,
+    Integer,
+    DateTime,
+    JSON,
+    Index,
+    func,
+)
+from core.database import Base
+
+
+class JobModel(Base):
+    __tablename__ = "jobs"
+    # claiming scans queued jobs that are due and running jobs whose lease ran out
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    id = Column(String(32), primary_key=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+
+    # queued -> running -> succeeded | failed, back to queued on a retry
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime, nullable=False)
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_date = Column(DateTime, server_default=func.now())
+    updated_date = Column(
+        DateTime, server_default=func.now(), server_onupdate=func.now()
+    )
@@ -0,0 +1,143 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, update, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from jobs.models import JobModel
+from jobs.registry import handlers
+
+# A job is visible to workers while it is queued and due, or while it is
+# running but its lease (locked_until) ran out, i.e. the worker holding it
+# died or hung. Claiming takes the lease and counts an attempt in one UPDATE.
+
+CLAIMED_COLUMNS = (
+    JobModel.id,
+    JobModel.name,
+    JobModel.payload,
+    JobModel.attempts,
+    JobModel.max_attempts,
+)
+
+
+def utcnow() -> datetime:
+    # naive UTC, matching the DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def enqueue(
+    db: AsyncSession,
+    name: str,
+    payload: dict = None,
+    max_attempts: int = None,
+    delay: float = 0,
+) -> str:
+    """Adds a job and returns its id; the caller commits."""
+    if name not in handlers:
+        raise ValueError(f"no job handler registered for '{name}'")
+    job_id = uuid.uuid4().hex
+    await db.execute(
+        insert(JobModel).values(
+            id=job_id,
+            name=name,
+            payload=payload or {},
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            run_after=utcnow() + timedelta(seconds=delay),
+        )
+    )
+    return job_id
+
+
+def _visible(now: datetime):
+    return or_(
+        and_(JobModel.status == "queued", JobModel.run_after <= now),
+        and_(JobModel.status == "running", JobModel.locked_until < now),
+    )
+
+
+async def claim(db: AsyncSession, worker_id: str, visibility_timeout: float):
+    """Leases the next visible job to the worker, None when there is none.
+
+    SKIP LOCKED lets concurrent workers on postgres pass over each other's
+    candidates; the visibility check is repeated on the outer UPDATE so a
+    job claimed in between is not taken twice.
+    """
+    now = utcnow()
+    candidate = (
+        select(JobModel.id)
+        .where(_visible(now))
+        .order_by(JobModel.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(JobModel)
+        .where(JobModel.id == candidate, _visible(now))
+        .values(
+            status="running",
+            attempts=JobModel.attempts + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            locked_by=worker_id,
+            updated_date=func.now(),
+        )
+        .returning(*CLAIMED_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    return result.one_or_none()
+
+
+def _leased(job_id: str, worker_id: str):
+    # a worker whose lease expired and was taken over must not touch the job
+    return (
+        JobModel.id == job_id,
+        JobModel.locked_by == worker_id,
+        JobModel.status == "running",
+    )
+
+
+async def extend_lease(
+    db: AsyncSession, job_id: str, worker_id: str, visibility_timeout: float
+) -> bool:
+    result = await db.execute(
+        update(JobModel)
+        .where(*_leased(job_id, worker_id))
+        .values(locked_until=utcnow() + timedelta(seconds=visibility_timeout))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def mark_succeeded(db: AsyncSession, job_id: str, worker_id: str, result) -> bool:
+    outcome = await db.execute(
+        update(JobModel)
+        .where(*_leased(job_id, worker_id))
+        .values(
+            status="succeeded",
+            result=result,
+            error=None,
+            locked_until=None,
+            updated_date=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return outcome.rowcount == 1
+
+
+async def mark_failed(
+    db: AsyncSession, job, worker_id: str, error: str, retry: bool = True
+) -> bool:
+    """Requeues the job with exponential backoff, or fails it for good."""
+    if retry and job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        values = {"status": "queued", "run_after": utcnow() + timedelta(seconds=delay)}
+    else:
+        values = {"status": "failed"}
+    outcome = await db.execute(
+        update(JobModel)
+        .where(*_leased(job.id, worker_id))
+        .values(**values, error=error, locked_until=None, updated_date=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    return outcome.rowcount == 1
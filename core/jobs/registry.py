@@ -0,0 +1,14 @@
+# job name -> async handler called with the job payload as keyword arguments
+handlers = {}
+
+
+def job(name: str):
+    """Registers an async function as the handler of jobs called `name`."""
+
+    def register(fn):
+        if name in handlers:
+            raise ValueError(f"job handler '{name}' is already registered")
+        handlers[name] = fn
+        return fn
+
+    return register
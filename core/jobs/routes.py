@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Path, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from jobs.models import JobModel
+from jobs.schemas import JobResponseSchema
+
+router = APIRouter(tags=["jobs"], prefix="/jobs")
+
+
+@router.get("/{job_id}", response_model=JobResponseSchema)
+async def retrieve_job(
+    job_id: str = Path(..., max_length=32),
+    db: AsyncSession = Depends(get_async_db),
+):
+    result = await db.execute(select(JobModel).filter_by(id=job_id))
+    job_obj = result.scalars().first()
+    if not job_obj:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_obj
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import Any, Optional, Literal
+from datetime import datetime
+
+
+class JobEnqueuedSchema(BaseModel):
+    detail: str = Field(..., description="Human readable status")
+    job_id: str = Field(..., description="Id to poll at /jobs/{job_id}")
+
+
+class JobResponseSchema(BaseModel):
+    id: str = Field(..., description="Unique identifier of the job")
+    name: str = Field(..., description="Registered handler running the job")
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int = Field(..., description="Times a worker picked the job up")
+    max_attempts: int = Field(..., description="Attempts before the job fails")
+    result: Optional[Any] = Field(None, description="Return value of the handler")
+    error: Optional[str] = Field(None, description="Last error of the handler")
+    created_date: datetime = Field(..., description="Enqueue date and time")
+    updated_date: datetime = Field(..., description="Last state change")
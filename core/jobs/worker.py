@@ -0,0 +1,148 @@
+"""Runs queued jobs; start with `python -m jobs.worker --concurrency 4`."""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from core.config import settings
+from jobs import queue
+from jobs.registry import handlers
+import jobs.handlers  # noqa: F401  registers the handlers
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Runs `concurrency` claim-and-execute loops against the jobs table.
+
+    While a handler runs its lease is extended every third of the visibility
+    timeout, so only a dead or stuck worker lets a job become visible again.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        concurrency: int = None,
+        visibility_timeout: float = None,
+        poll_interval: float = None,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.JOBS_CONCURRENCY
+        self.visibility_timeout = visibility_timeout or settings.JOBS_VISIBILITY_TIMEOUT
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._loops = []
+
+    async def run_once(self) -> bool:
+        """Claims and runs one job, False when nothing was visible."""
+        async with self.session_factory() as db:
+            job = await queue.claim(db, self.worker_id, self.visibility_timeout)
+            await db.commit()
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    async def drain(self) -> int:
+        """Runs jobs until none is visible, returns how many ran."""
+        count = 0
+        while await self.run_once():
+            count += 1
+        return count
+
+    async def _execute(self, job) -> None:
+        handler = handlers.get(job.name)
+        if job.attempts > job.max_attempts:
+            # the previous holder's lease ran out on its last attempt
+            await self._finish(queue.mark_failed, job, "lease expired", retry=False)
+            return
+        if handler is None:
+            await self._finish(
+                queue.mark_failed, job, f"unknown job '{job.name}'", retry=False
+            )
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            result = await handler(**job.payload)
+        except Exception as e:
+            logger.exception("job %s (%s) failed", job.id, job.name)
+            await self._finish(queue.mark_failed, job, f"{type(e).__name__}: {e}")
+        else:
+            async with self.session_factory() as db:
+                await queue.mark_succeeded(db, job.id, self.worker_id, result)
+                await db.commit()
+        finally:
+            heartbeat.cancel()
+
+    async def _finish(self, mark, job, error: str, retry: bool = True) -> None:
+        async with self.session_factory() as db:
+            await mark(db, job, self.worker_id, error, retry=retry)
+            await db.commit()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                async with self.session_factory() as db:
+                    await queue.extend_lease(
+                        db, job_id, self.worker_id, self.visibility_timeout
+                    )
+                    await db.commit()
+            except Exception:
+                logger.exception("could not extend the lease of job %s", job_id)
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.exception("job worker loop failed")
+                ran = False
+            if not ran:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._loops = [
+            asyncio.create_task(self._loop()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Lets running jobs finish; unfinished ones reappear after their lease."""
+        self._stopping.set()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+
+
+async def run(concurrency: int) -> None:
+    from core.database import AsyncSessionLocal
+
+    worker = JobWorker(AsyncSessionLocal, concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    worker.start()
+    logger.info("job worker %s running %d loops", worker.worker_id, worker.concurrency)
+    await stop.wait()
+    await worker.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_CONCURRENCY)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,38 @@
-from fastapi import FastAPI, Depends, Request,HTTPException,status,BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from tasks.routes import router as tasks_routes
 from users.routes import router as users_routes
+from internal.routes import router as internal_routes
+from jobs.routes import router as jobs_routes
+from weather.routes import router as weather_routes
+from weather.service import weather_service
+from jobs.queue import enqueue
+from jobs.worker import JobWorker
+from jobs.schemas import JobEnqueuedSchema
+from core.database import (
+    get_async_db,
+    AsyncSessionLocal,
+    AsyncReadSessionLocal,
+    async_engine,
+    replica_async_engine,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 import time
 from fastapi.middleware.cors import CORSMiddleware
 import random
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-import httpx
 from core.config import settings
-import sentry_sdk
-
-sentry_sdk.init(
-    dsn=settings.SENTRY_DSN,
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for performance monitoring.
-    traces_sample_rate=1.0,
-)
+from auth.hashing import password_hasher
+from core.metrics import MetricsMiddleware, metrics_endpoint
+from core.admission import AdmissionMiddleware
+from core.email_util import outbox
+from core.sentry import init_sentry
+from core.warmup import warm_up
 
 
-scheduler = AsyncIOScheduler()
-
 def my_task():
     print(f"Task executed at {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -42,12 +51,32 @@ tags_metadata = [
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Application startup")
-    # scheduler.add_job(my_task, IntervalTrigger(seconds=10))
+    # everything that costs time or opens connections starts here, not at
+    # import, so tests, alembic and the gunicorn master stay cheap
+    init_sentry(app)
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    scheduler = AsyncIOScheduler()
+    # scheduler.add_job(my_task, "interval", seconds=10)
     scheduler.start()
+    if settings.DB_WARMUP:
+        await warm_up(async_engine, AsyncSessionLocal)
+        if replica_async_engine is not None:
+            await warm_up(replica_async_engine, AsyncReadSessionLocal)
+    outbox.start()
+    worker = None
+    if settings.JOBS_EMBEDDED_WORKER:
+        worker = JobWorker(AsyncSessionLocal)
+        worker.start()
     
     yield
     
+    if worker is not None:
+        await worker.stop()
     scheduler.shutdown()
+    await outbox.stop()
+    await weather_service.aclose()
+    password_hasher.shutdown()
     print("Application shutdown")
 
 
@@ -71,19 +100,21 @@ app = FastAPI(
     },
     lifespan=lifespan,
     openapi_tags=tags_metadata,
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(tasks_routes)
 app.include_router(users_routes)
+app.include_router(internal_routes)
+app.include_router(jobs_routes)
+app.include_router(weather_routes)
 
 
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.perf_counter()
-    response = await call_next(request)
-    process_time = time.perf_counter() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# 503 past the concurrency limit, 429 on an empty token bucket
+app.add_middleware(AdmissionMiddleware)
+# latency, status and size per route template, also sets X-Process-Time
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 
 origins = [
@@ -107,7 +138,11 @@ async def http_exception_handler(request, exc):
         "detail": str(exc.detail)
     
     }
-    return JSONResponse(status_code=exc.status_code , content=error_response)
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content=error_response,
+        headers=getattr(exc, "headers", None),
+    )
 
 @app.exception_handler(RequestValidationError)
 async def http_validation_exception_handler(request, exc):
@@ -115,85 +150,40 @@ async def http_validation_exception_handler(request, exc):
         "error": True,
         "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
         "detail": "There was a problem with your form request",
-        "content":exc.errors()
+        "content":jsonable_encoder(exc.errors())
     
     }
-    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY , content=error_response)
-
-
-# background task handling
+    return ORJSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY , content=error_response)
 
-def start_task(task_id):
-    print(f"doing the process: {task_id}")
-    time.sleep(random.randint(3,10))
-    print(f"finished task {task_id}")
 
+# background task handling, see jobs.handlers for start_task
 
-@app.get("/initiate-task", status_code=200)
-async def initiate_task(background_tasks: BackgroundTasks):
-    background_tasks.add_task(start_task,task_id=random.randint(1,100))
-    return JSONResponse(content={"detail":"task is done"})
+@app.get("/initiate-task", status_code=202, response_model=JobEnqueuedSchema)
+async def initiate_task(db: AsyncSession = Depends(get_async_db)):
+    job_id = await enqueue(db, "start_task", {"task_id": random.randint(1, 100)})
+    await db.commit()
+    return ORJSONResponse(
+        status_code=202, content={"detail": "task is queued", "job_id": job_id}
+    )
 
 @app.get("/is_ready", status_code=200)
 async def readiness():
-    return JSONResponse(content="ok")
-
+    return ORJSONResponse(content="ok")
 
 
 
-# caching example
-
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from fastapi_cache.decorator import cache
-
-from redis import asyncio as aioredis
-
-# Set up the cache backend
-redis = aioredis.from_url(settings.REDIS_URL)
-cache_backend = RedisBackend(redis)
-FastAPICache.init(cache_backend, prefix="fastapi-cache")
-
-async def request_current_weather(latitude: float, longitude: float):
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "current": "temperature_2m,relative_humidity_2m"
-    }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-
-    if response.status_code == 200:
-        data = response.json()
-        current_weather = data.get("current", {})
-        return current_weather
-    else:
-        return None
-    
-
-@app.get("/fetch-current-weather", status_code=200)
-@cache(expire=10)
-async def fetch_current_weather(latitude: float = 40.7128, longitude: float = -74.0060):
-    current_weather = await request_current_weather(latitude, longitude)
-    if current_weather:
-
-        return JSONResponse(content={"current_weather": current_weather})
-    else:
-        return JSONResponse(content={"detail": "Failed to fetch weather"}, status_code=500)
 
 from core.email_util import send_email
     
 # Endpoint to send email
-@app.get("/test-send-mail", status_code=200)
+@app.get("/test-send-mail", status_code=202)
 async def test_send_mail():
     await send_email(
         subject="Test Email from FastAPI",
         recipients=["recipient@example.com"],
         body="This is a test email sent using the email_util function."
     )
-    return JSONResponse(content={"detail": "Email has been sent"})
+    return ORJSONResponse(status_code=202, content={"detail": "Email has been queued"})
 
 
 @app.get("/sentry-debug")
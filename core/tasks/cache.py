@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import time
+import orjson
+from redis.exceptions import RedisError
+from core.config import settings
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCacheBackend:
+    async def mget(self, keys: list):
+        return await get_redis().mget(keys)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await get_redis().set(key, value, ex=ttl)
+
+    async def incr(self, key: str) -> int:
+        return await get_redis().incr(key)
+
+
+class MemoryCacheBackend:
+    """Process local stand-in for redis, for tests and single worker setups."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def mget(self, keys: list):
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            value, expires_at = self._data.get(key, (None, None))
+            if expires_at is not None and expires_at <= now:
+                value = None
+            values.append(value)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._data[key] = (value, time.monotonic() + ttl)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._data.get(key, (0, None))[0] or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+
+class TaskQueryCache:
+    """Per-user read-through cache of serialized task query responses.
+
+    Entries are stored under the user, route and query parameters together
+    with the user's generation at the time they were written. Writes bump the
+    generation, which orphans every older entry of that user at once; the
+    generation and the entry are fetched with one MGET.
+
+    A generation bump that fails leaves the user's old entries current, so
+    this process stops reading and writing that user's entries until a
+    retried bump goes through.
+    """
+
+    # after a backend failure redis is left alone for this many seconds
+    retry_after = 5
+
+    def __init__(self, backend, ttl: int, enabled: bool):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._unavailable_until = 0.0
+        # users whose generation bump after a write has not succeeded yet
+        self._unbumped = set()
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._unavailable_until
+
+    def _failed(self, e: Exception) -> None:
+        self.errors += 1
+        self._unavailable_until = time.monotonic() + self.retry_after
+        logger.warning("task cache backend failed: %s", e)
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"tasks:gen:{user_id}"
+
+    @staticmethod
+    def _entry_key(user_id: int, route: str, params) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(params.multi_items()))
+        digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+        return f"tasks:{user_id}:{route}:{digest}"
+
+    async def get(self, user_id: int, route: str, params):
+        """Looks up an entry, returns ((body, headers) or None, generation).
+
+        The generation has to be handed back to set(), so a response built
+        from data read before a concurrent write is never stored as current.
+        It is None when the cache is not usable right now.
+        """
+        if not self._available():
+            return None, None
+        if user_id in self._unbumped and not await self._bump(user_id):
+            return None, None
+        try:
+            generation, entry = await self.backend.mget(
+                [self._generation_key(user_id), self._entry_key(user_id, route, params)]
+            )
+        except (RedisError, OSError) as e:
+            self._failed(e)
+            return None, None
+        generation = int(generation or 0)
+        if entry is not None:
+            entry_generation, headers, body = entry.split(b"\n", 2)
+            if int(entry_generation) == generation:
+                self.hits += 1
+                return (body, orjson.loads(headers)), generation
+        self.misses += 1
+        return None, generation
+
+    async def set(
+        self, user_id: int, route: str, params, generation, body: bytes, headers=None
+    ) -> None:
+        if (
+            generation is None
+            or not self._available()
+            or user_id in self._unbumped
+        ):
+            return
+        entry = b"\n".join(
+            [str(generation).encode(), orjson.dumps(headers or {}), body]
+        )
+        try:
+            await self.backend.set(
+                self._entry_key(user_id, route, params), entry, self.ttl
+            )
+        except (RedisError, OSError) as e:
+            self._failed(e)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Starts a new generation for the user; call after the write commits."""
+        if not self.enabled:
+            return
+        self._unbumped.add(user_id)
+        await self._bump(user_id)
+
+    async def _bump(self, user_id: int) -> bool:
+        try:
+            await self.backend.incr(self._generation_key(user_id))
+        except (RedisError, OSError) as e:
+            self._failed(e)
+            return False
+        self._unbumped.discard(user_id)
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "unbumped_users": len(self._unbumped),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+task_cache = TaskQueryCache(
+    backend=MemoryCacheBackend()
+    if settings.TASK_CACHE_BACKEND == "memory"
+    else RedisCacheBackend(),
+    ttl=settings.TASK_CACHE_TTL,
+    enabled=settings.TASK_CACHE_ENABLED,
+)
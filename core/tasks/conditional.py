@@ -0,0 +1,74 @@
+from fastapi import Depends, Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.jwt_auth import get_authenticated_user
+from auth.principal import Principal
+from core.database import get_async_read_db
+from tasks.stats import get_stats
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+async def load_task_stats(request: Request, db: AsyncSession, user_id: int) -> dict:
+    """The user's task stats row, read at most once per request."""
+    stats = getattr(request.state, "task_stats", None)
+    if stats is None:
+        stats = request.state.task_stats = await get_stats(db, user_id)
+    return stats
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison, the W/ prefix is ignored on both sides
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(",")
+    )
+
+
+async def check_etag(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    """Router dependency answering conditional GETs before the endpoint runs.
+
+    Every task write bumps the user's version in task_stats, so a single
+    primary key lookup is enough to validate both a task and a list of tasks.
+    """
+    if request.method != "GET":
+        return
+    stats = await load_task_stats(request, db, user.id)
+    task_id = request.path_params.get("task_id")
+    if task_id is not None:
+        etag = f'W/"u{user.id}-t{task_id}-v{stats["version"]}"'
+    else:
+        etag = f'W/"u{user.id}-v{stats["version"]}"'
+    request.state.etag = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        raise NotModified(etag)
+
+
+class ConditionalRoute(APIRoute):
+    """Turns NotModified into a bare 304 and stamps the etag on 200 responses."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def conditional_handler(request: Request) -> Response:
+            try:
+                response = await handler(request)
+            except NotModified as e:
+                return Response(status_code=304, headers={"ETag": e.etag})
+            etag = getattr(request.state, "etag", None)
+            if etag and response.status_code == 200 and "etag" not in response.headers:
+                response.headers["ETag"] = etag
+            return response
+
+        return conditional_handler
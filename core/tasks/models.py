@@ -7,6 +7,9 @@ from sqlalchemy import (
     Integer,
     DateTime,
     ForeignKey,
+    Index,
+    DDL,
+    event,
 )
 from core.database import Base
 from sqlalchemy.orm import relationship
@@ -27,3 +30,62 @@ class TaskModel(Base):
     )
 
     user = relationship("UserModel", back_populates="tasks", uselist=False)
+
+    # seek indexes for keyset pagination of a user's tasks
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_id_is_completed_id", "user_id", "is_completed", "id"),
+    )
+
+
+# full text search over title and description, kept up to date by the database
+# itself: a generated tsvector column on postgres, an fts5 table fed by
+# triggers on sqlite. The alembic migration creates the same objects.
+TASK_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+        "title, description, content='tasks', content_rowid='id')",
+        "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO tasks_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+    ],
+}
+
+for dialect, statements in TASK_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            TaskModel.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
+event.listen(
+    TaskModel.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
+
+
+class TaskStatsModel(Base):
+    """Per-user task counters kept in step with every task write."""
+
+    __tablename__ = "task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    # bumped on every write of the user's tasks, backs the list/detail etags
+    version = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,73 @@
+from sqlalchemy import insert, select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from tasks.models import TaskModel
+from tasks.serializers import TASK_COLUMNS
+from tasks.stats import apply_stats_delta
+
+# Each helper issues one ownership scoped statement returning the response
+# columns, and applies the stats delta in the same transaction. The caller
+# commits. A None result means no task of that user matched.
+
+
+async def create_task_returning(db: AsyncSession, user_id: int, values: dict):
+    result = await db.execute(
+        insert(TaskModel)
+        .values(**values, user_id=user_id)
+        .returning(*TASK_COLUMNS)
+    )
+    row = result.one()
+    await apply_stats_delta(db, user_id, total=1, completed=int(bool(row.is_completed)))
+    return row
+
+
+async def update_task_returning(
+    db: AsyncSession, user_id: int, task_id: int, values: dict
+):
+    owned = (TaskModel.user_id == user_id, TaskModel.id == task_id)
+
+    # RETURNING only sees the new values, so the previous is_completed comes
+    # from a snapshot of the row taken before the update: a materialized CTE
+    # joined by the UPDATE. FOR UPDATE makes postgres snapshot the latest
+    # committed version, sqlite ignores it and serializes writers anyway.
+    old = (
+        select(TaskModel.id, TaskModel.is_completed.label("was_completed"))
+        .where(*owned)
+        .with_for_update()
+        .cte("old")
+        .prefix_with("MATERIALIZED")
+    )
+    # sqlite refuses columns of joined tables in RETURNING, a subquery is fine
+    was_completed = select(old.c.was_completed).correlate(None).scalar_subquery()
+    result = await db.execute(
+        update(TaskModel)
+        .where(*owned, TaskModel.id == old.c.id)
+        .values(**values, updated_date=func.now())
+        .returning(*TASK_COLUMNS, was_completed.label("was_completed"))
+        .execution_options(synchronize_session=False)
+    )
+    # replayed twice: once for the previous value, once as the response row
+    rows = result.freeze()
+    row = rows().one_or_none()
+    if row is None:
+        return None
+    await apply_stats_delta(
+        db,
+        user_id,
+        completed=int(bool(row.is_completed)) - int(bool(row.was_completed)),
+    )
+    return rows().columns(*range(len(TASK_COLUMNS))).one()
+
+
+async def delete_task_returning(db: AsyncSession, user_id: int, task_id: int):
+    result = await db.execute(
+        delete(TaskModel)
+        .where(TaskModel.user_id == user_id, TaskModel.id == task_id)
+        .returning(TaskModel.id, TaskModel.is_completed)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is not None:
+        await apply_stats_delta(
+            db, user_id, total=-1, completed=-int(bool(row.is_completed))
+        )
+    return row
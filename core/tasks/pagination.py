@@ -0,0 +1,23 @@
+import base64
+import json
+from fastapi import HTTPException, status
+
+
+def encode_cursor(last_id: int) -> str:
+    """Builds the opaque cursor pointing right after the given task id."""
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Returns the task id a cursor points after, 400 on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded))["after"]
+        if not isinstance(after, int) or after < 0:
+            raise ValueError(after)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return after
@@ -1,19 +1,42 @@
-from fastapi import APIRouter, Path, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Path, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from tasks.schemas import *
 from tasks.models import TaskModel
-from users.models import UserModel
-from sqlalchemy.orm import Session
-from core.database import get_db
+from auth.principal import Principal
+from sqlalchemy import select, insert, update, delete, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db, get_async_read_db, get_async_session_factory
 from typing import List
+from itertools import groupby
 from auth.jwt_auth import get_authenticated_user
+from tasks.pagination import encode_cursor, decode_cursor
+from tasks.stats import apply_stats_delta
+from tasks.serializers import TASK_COLUMNS, task_row_to_dict
+from tasks.mutations import (
+    create_task_returning,
+    update_task_returning,
+    delete_task_returning,
+)
+from tasks.conditional import ConditionalRoute, check_etag, load_task_stats
+from tasks.cache import task_cache
+from tasks.search import search_terms, search_tasks
+import orjson
 
 
-router = APIRouter(tags=["tasks"])
+# every GET of this router honours If-None-Match, see tasks.conditional
+router = APIRouter(
+    tags=["tasks"],
+    route_class=ConditionalRoute,
+    dependencies=[Depends(check_etag)],
+)
+
+# rows fetched per round trip from the server side cursor while exporting
+EXPORT_CHUNK_SIZE = 1000
 
 
 @router.get("/tasks", response_model=List[TaskResponseSchema])
 async def retrieve_tasks_list(
+    request: Request,
     completed: bool = Query(
         None, description="filter tasks based on being completed or not"
     ),
@@ -23,79 +46,287 @@ async def retrieve_tasks_list(
     offset: int = Query(
         0, ge=0, description="use for paginating based on passed items"
     ),
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_authenticated_user),
+    cursor: str = Query(
+        None,
+        description="opaque cursor from the X-Next-Cursor header, "
+        "seeks past the previous page instead of using offset",
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_authenticated_user),
 ):
-    query = db.query(TaskModel).filter_by(user_id=user.id)
+    stats = await load_task_stats(request, db, user.id)
+    if completed is None:
+        headers = {"X-Total-Count": str(stats["total"])}
+    else:
+        headers = {
+            "X-Total-Count": str(stats["completed"] if completed else stats["open"])
+        }
+
+    cached, generation = await task_cache.get(user.id, "list", request.query_params)
+    if cached is not None:
+        body, cached_headers = cached
+        return Response(
+            body, media_type="application/json", headers={**headers, **cached_headers}
+        )
+
+    # ordering on id lets (user_id, [is_completed,] id) indexes serve the page
+    query = select(*TASK_COLUMNS).filter_by(user_id=user.id)
     if completed is not None:
         query = query.filter_by(is_completed=completed)
+    query = query.order_by(TaskModel.id)
+
+    if cursor is not None:
+        query = query.where(TaskModel.id > decode_cursor(cursor))
+    else:
+        query = query.offset(offset)
+
+    # one extra row tells us whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    page_headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        page_headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+    body = orjson.dumps([task_row_to_dict(row) for row in rows])
+    await task_cache.set(
+        user.id, "list", request.query_params, generation, body, page_headers
+    )
+    return Response(
+        body, media_type="application/json", headers={**headers, **page_headers}
+    )
+
+
+@router.get("/tasks/stats", response_model=TaskStatsResponseSchema)
+async def retrieve_tasks_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    return await load_task_stats(request, db, user.id)
+
+
+@router.get("/tasks/search", response_model=List[TaskResponseSchema])
+async def search_tasks_list(
+    q: str = Query(..., min_length=1, description="words to look for in title and description"),
+    limit: int = Query(
+        10, gt=0, le=50, description="limiting the number of items to retrieve"
+    ),
+    offset: int = Query(
+        0, ge=0, description="use for paginating based on passed items"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    """Tasks matching every word of q as a prefix, best matches first."""
+    terms = search_terms(q)
+    if not terms:
+        return Response(b"[]", media_type="application/json")
+    rows = await search_tasks(db, user.id, terms, limit, offset)
+    return Response(
+        orjson.dumps([task_row_to_dict(row) for row in rows]),
+        media_type="application/json",
+    )
+
+
+@router.get("/tasks/export")
+async def export_tasks(
+    session_factory=Depends(get_async_session_factory),
+    user: Principal = Depends(get_authenticated_user),
+):
+    """Streams every task of the user as newline delimited json."""
+    user_id = user.id
+
+    async def generate():
+        # the request scoped session is closed before streaming starts
+        async with session_factory() as db:
+            result = await db.stream(
+                select(*TASK_COLUMNS)
+                .filter_by(user_id=user_id)
+                .order_by(TaskModel.id)
+                .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield b"".join(
+                    orjson.dumps(task_row_to_dict(row), option=orjson.OPT_APPEND_NEWLINE)
+                    for row in rows
+                )
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+# bulk routes are declared before /tasks/{task_id} so "bulk" is not taken as an id
+
 
-    return query.limit(limit).offset(offset).all()
+@router.post("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def bulk_create_tasks(
+    request: TaskBulkCreateSchema,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    rows = [{**item.model_dump(), "user_id": user.id} for item in request.items]
+    result = await db.execute(
+        insert(TaskModel).returning(TaskModel.id, sort_by_parameter_order=True),
+        rows,
+    )
+    task_ids = result.scalars().all()
+    await apply_stats_delta(
+        db,
+        user.id,
+        total=len(rows),
+        completed=sum(1 for row in rows if row["is_completed"]),
+    )
+    await db.commit()
+    await task_cache.invalidate(user.id)
+    return {"results": [{"id": i, "status": "created"} for i in task_ids]}
 
 
+@router.patch("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def bulk_update_tasks(
+    request: TaskBulkUpdateSchema,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    requested_ids = [item.id for item in request.items]
+    result = await db.execute(
+        select(TaskModel.id, TaskModel.is_completed)
+        .where(TaskModel.user_id == user.id, TaskModel.id.in_(requested_ids))
+        .with_for_update()
+    )
+    completed_before = {row.id: bool(row.is_completed) for row in result}
+    owned_ids = set(completed_before)
+
+    items = [item for item in request.items if item.id in owned_ids]
+    rows = []
+    # fields left out keep their value, so items only update what they set;
+    # consecutive items setting the same fields share one executemany and
+    # the batches run in request order
+    tasks = TaskModel.__table__
+    for fields, batch in groupby(
+        items, key=lambda item: frozenset(item.model_fields_set - {"id"})
+    ):
+        batch_rows = [
+            {"task_id": item.id, **item.model_dump(include=fields)} for item in batch
+        ]
+        # still scoped to the owner in case ids changed hands
+        await db.execute(
+            update(tasks)
+            .where(tasks.c.id == bindparam("task_id"), tasks.c.user_id == user.id)
+            .values(
+                updated_date=func.now(),
+                **{field: bindparam(field) for field in sorted(fields)},
+            ),
+            batch_rows,
+        )
+        rows.extend(batch_rows)
+    if rows:
+        # later items win when an id is repeated, same as the UPDATEs
+        completed_after = dict(completed_before)
+        completed_after.update((row["task_id"], row["is_completed"]) for row in rows)
+        await apply_stats_delta(
+            db,
+            user.id,
+            completed=sum(completed_after.values()) - sum(completed_before.values()),
+        )
+    await db.commit()
+    await task_cache.invalidate(user.id)
+    return {
+        "results": [
+            {"id": i, "status": "updated" if i in owned_ids else "not_found"}
+            for i in requested_ids
+        ]
+    }
+
+
+@router.delete("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def bulk_delete_tasks(
+    request: TaskBulkDeleteSchema,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    result = await db.execute(
+        delete(TaskModel)
+        .where(TaskModel.user_id == user.id, TaskModel.id.in_(request.ids))
+        .returning(TaskModel.id, TaskModel.is_completed)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.all()
+    deleted_ids = {row.id for row in deleted}
+    await apply_stats_delta(
+        db,
+        user.id,
+        total=-len(deleted),
+        completed=-sum(1 for row in deleted if row.is_completed),
+    )
+    await db.commit()
+    await task_cache.invalidate(user.id)
+    return {
+        "results": [
+            {"id": i, "status": "deleted" if i in deleted_ids else "not_found"}
+            for i in request.ids
+        ]
+    }
+
 
 @router.get("/tasks/{task_id}", response_model=TaskResponseSchema)
 async def retrieve_task_detail(
+    request: Request,
     task_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_authenticated_user),
 ):
-    task_obj = (
-        db.query(TaskModel).filter_by(user_id=user.id, id=task_id).first()
+    route = f"detail:{task_id}"
+    cached, generation = await task_cache.get(user.id, route, request.query_params)
+    if cached is not None:
+        return Response(cached[0], media_type="application/json")
+
+    result = await db.execute(
+        select(*TASK_COLUMNS).filter_by(user_id=user.id, id=task_id)
     )
-    if not task_obj:
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task_obj
+    body = orjson.dumps(task_row_to_dict(row))
+    await task_cache.set(user.id, route, request.query_params, generation, body)
+    return Response(body, media_type="application/json")
 
 
 @router.post("/tasks", response_model=TaskResponseSchema)
 async def create_task(
     request: TaskCreateSchema,
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
 ):
-    data = request.model_dump()
-    data.update({"user_id": user.id})
-    task_obj = TaskModel(**data)
-    db.add(task_obj)
-    db.commit()
-    db.refresh(task_obj)
-    return task_obj
+    row = await create_task_returning(db, user.id, request.model_dump())
+    await db.commit()
+    await task_cache.invalidate(user.id)
+    return ORJSONResponse(task_row_to_dict(row))
 
 
 @router.put("/tasks/{task_id}", response_model=TaskResponseSchema)
 async def update_task(
     request: TaskUpdateSchema,
     task_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
 ):
-    task_obj = (
-        db.query(TaskModel).filter_by(user_id=user.id, id=task_id).first()
+    row = await update_task_returning(
+        db, user.id, task_id, request.model_dump(exclude_unset=True)
     )
-    if not task_obj:
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    # Update fields using setattr
-    for field, value in request.model_dump(exclude_unset=True).items():
-        setattr(task_obj, field, value)
-
-    db.commit()  # Commit the changes to the database
-    db.refresh(task_obj)  # Refresh the task object to reflect the updated data
-
-    return task_obj  # Return the updated task object
+    await db.commit()
+    await task_cache.invalidate(user.id)
+    return ORJSONResponse(task_row_to_dict(row))
 
 
 @router.delete("/tasks/{task_id}", status_code=204)
 async def delete_task(
     task_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
 ):
-    task_obj = (
-        db.query(TaskModel).filter_by(user_id=user.id, id=task_id).first()
-    )
-    if not task_obj:
+    row = await delete_task_returning(db, user.id, task_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    db.delete(task_obj)
-    db.commit()
+    await db.commit()
+    await task_cache.invalidate(user.id)
@@ -1,8 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Literal
 from datetime import datetime
 
 
+# upper bound of items accepted by a single bulk request
+MAX_BULK_ITEMS = 1000
+
+
 class TaskBaseSchema(BaseModel):
     title: str = Field(
         ..., max_length=150, min_length=5, description="Title of the task"
@@ -30,3 +34,47 @@ class TaskResponseSchema(TaskBaseSchema):
     updated_date: datetime = Field(
         ..., description="Updating date and time of the object"
     )
+
+
+class TaskBulkCreateSchema(BaseModel):
+    items: List[TaskCreateSchema] = Field(
+        ..., min_length=1, max_length=MAX_BULK_ITEMS, description="Tasks to create"
+    )
+
+
+class TaskBulkUpdateItemSchema(TaskUpdateSchema):
+    id: int = Field(..., gt=0, description="Identifier of the task to update")
+
+
+class TaskBulkUpdateSchema(BaseModel):
+    items: List[TaskBulkUpdateItemSchema] = Field(
+        ..., min_length=1, max_length=MAX_BULK_ITEMS, description="Tasks to update"
+    )
+
+
+class TaskBulkDeleteSchema(BaseModel):
+    ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BULK_ITEMS,
+        description="Identifiers of the tasks to delete",
+    )
+
+
+class TaskBulkResultSchema(BaseModel):
+    id: int = Field(..., description="Identifier of the affected task")
+    status: Literal["created", "updated", "deleted", "not_found"] = Field(
+        ..., description="Outcome for this item"
+    )
+
+
+class TaskBulkResponseSchema(BaseModel):
+    results: List[TaskBulkResultSchema] = Field(
+        ..., description="One result per requested item, in request order"
+    )
+
+
+class TaskStatsResponseSchema(BaseModel):
+    total: int = Field(..., description="Number of tasks of the user")
+    completed: int = Field(..., description="Number of completed tasks")
+    open: int = Field(..., description="Number of tasks not completed yet")
@@ -0,0 +1,50 @@
+import re
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# title matches weigh more than description matches on both backends
+SEARCH_QUERIES = {
+    "postgresql": text(
+        "SELECT id, title, description, is_completed, created_date, updated_date "
+        "FROM tasks, to_tsquery('simple', :query) AS query "
+        "WHERE user_id = :user_id AND search_vector @@ query "
+        "ORDER BY ts_rank_cd(search_vector, query) DESC, id "
+        "LIMIT :limit OFFSET :offset"
+    ),
+    "sqlite": text(
+        "SELECT tasks.id, tasks.title, tasks.description, tasks.is_completed, "
+        "tasks.created_date, tasks.updated_date "
+        "FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid "
+        "WHERE tasks_fts MATCH :query AND tasks.user_id = :user_id "
+        "ORDER BY bm25(tasks_fts, 10.0, 1.0), tasks.id "
+        "LIMIT :limit OFFSET :offset"
+    ),
+}
+
+
+def search_terms(query: str) -> list:
+    """Words of the user's query; operators and quotes are never passed on."""
+    return re.findall(r"\w+", query.lower())
+
+
+def build_match(dialect: str, terms: list) -> str:
+    # every term has to match, as a prefix so "meet" finds "meeting"
+    if dialect == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_tasks(
+    db: AsyncSession, user_id: int, terms: list, limit: int, offset: int
+):
+    dialect = db.get_bind().dialect.name
+    result = await db.execute(
+        SEARCH_QUERIES[dialect],
+        {
+            "query": build_match(dialect, terms),
+            "user_id": user_id,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+    return result.all()
@@ -0,0 +1,20 @@
+from tasks.models import TaskModel
+
+# columns making up TaskResponseSchema, selected as plain rows by the routes
+TASK_COLUMNS = (
+    TaskModel.id,
+    TaskModel.title,
+    TaskModel.description,
+    TaskModel.is_completed,
+    TaskModel.created_date,
+    TaskModel.updated_date,
+)
+
+
+def task_row_to_dict(row) -> dict:
+    """Payload of a row selected with TASK_COLUMNS.
+
+    Rows come straight from the tasks table, which already enforces what
+    TaskResponseSchema would check, so they skip pydantic and go to orjson.
+    """
+    return row._asdict()
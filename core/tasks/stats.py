@@ -0,0 +1,77 @@
+from sqlalchemy import select, func, case, insert, update, exists
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from tasks.models import TaskModel, TaskStatsModel
+
+UPSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+async def apply_stats_delta(
+    db: AsyncSession, user_id: int, total: int = 0, completed: int = 0
+) -> None:
+    """Adds the deltas to the user's counters inside the caller's transaction.
+
+    Every call also bumps the user's version, so it has to run for any task
+    write, even one that leaves the counters unchanged.
+    """
+    upsert = UPSERTS[db.get_bind().dialect.name]
+    stmt = upsert(TaskStatsModel).values(
+        user_id=user_id, total=total, completed=completed, version=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskStatsModel.user_id],
+        set_={
+            "total": TaskStatsModel.total + stmt.excluded.total,
+            "completed": TaskStatsModel.completed + stmt.excluded.completed,
+            "version": TaskStatsModel.version + 1,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def get_stats(db: AsyncSession, user_id: int) -> dict:
+    result = await db.execute(
+        select(
+            TaskStatsModel.total, TaskStatsModel.completed, TaskStatsModel.version
+        ).filter_by(user_id=user_id)
+    )
+    row = result.one_or_none()
+    total, completed, version = row if row else (0, 0, 0)
+    return {
+        "total": total,
+        "completed": completed,
+        "open": total - completed,
+        "version": version,
+    }
+
+
+def rebuild_stats_statements(user_id: int = None):
+    """Statements recomputing counters from the tasks table, for backfills.
+
+    Existing rows are updated in place so their version keeps increasing.
+    """
+    user_tasks = TaskModel.user_id == TaskStatsModel.user_id
+    refresh = update(TaskStatsModel).values(
+        total=select(func.count(TaskModel.id)).where(user_tasks).scalar_subquery(),
+        completed=select(
+            func.count(TaskModel.id)
+        ).where(user_tasks, TaskModel.is_completed.is_(True)).scalar_subquery(),
+        version=TaskStatsModel.version + 1,
+    )
+    missing = (
+        select(
+            TaskModel.user_id,
+            func.count(TaskModel.id),
+            func.coalesce(func.sum(case((TaskModel.is_completed, 1), else_=0)), 0),
+        )
+        .where(TaskModel.user_id.is_not(None), ~exists().where(user_tasks))
+        .group_by(TaskModel.user_id)
+    )
+    if user_id is not None:
+        refresh = refresh.where(TaskStatsModel.user_id == user_id)
+        missing = missing.where(TaskModel.user_id == user_id)
+    fill = insert(TaskStatsModel).from_select(
+        ["user_id", "total", "completed"], missing
+    )
+    return refresh, fill
@@ -1,23 +1,54 @@
+import os
+
+# lifespans run by TestClient must not report to the real sentry project;
+# set before core.config builds the settings
+os.environ["SENTRY_DSN"] = ""
+
 from fastapi.testclient import TestClient
 from sqlalchemy import StaticPool
-from core.database import Base,create_engine,sessionmaker,get_db
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from core.database import Base,create_engine,sessionmaker,get_db,get_async_db,get_async_read_db,get_async_session_factory,read_your_writes
 from main import app
 import pytest
+import tempfile
 from faker import Faker
 from users.models import UserModel
 from tasks.models import TaskModel
+from tasks.stats import rebuild_stats_statements
+from tasks.cache import task_cache, MemoryCacheBackend
+from auth.token_auth import token_cache
+from core.admission import rate_limiter
 from auth.jwt_auth import generate_access_token
 
 fake = Faker()
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# no redis in the test environment
+task_cache.backend = MemoryCacheBackend()
+token_cache.use_redis = False
+read_your_writes.use_redis = False
+# the suite fires requests far faster than any real client
+rate_limiter.use_redis = False
+rate_limiter.enabled = False
+
+# sync and async engines have to see the same data, so a file is used instead of :memory:
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool
 )
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}")
 
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_async_db():
+    async with TestAsyncSessionLocal() as db:
+        yield db
 
 # module
 @pytest.fixture(scope="package")
@@ -33,8 +64,14 @@ def db_session():
 @pytest.fixture(scope="module",autouse=True)
 def override_dependencies(db_session):
     app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: TestAsyncSessionLocal
     yield
     app.dependency_overrides.pop(get_db,None)
+    app.dependency_overrides.pop(get_async_db,None)
+    app.dependency_overrides.pop(get_async_read_db,None)
+    app.dependency_overrides.pop(get_async_session_factory,None)
 
 
 # session
@@ -81,6 +118,9 @@ def generate_mock_data(db_session):
             )
         )
     db_session.add_all(tasks_list)
+    db_session.flush()
+    for statement in rebuild_stats_statements(user.id):
+        db_session.execute(statement)
     db_session.commit()
     print(f"added 10 tasks for user id {user.id}")
 
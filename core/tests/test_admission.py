@@ -0,0 +1,117 @@
+import asyncio
+import fakeredis.aioredis
+import httpx
+from fastapi import FastAPI
+from redis.exceptions import ConnectionError as RedisConnectionError
+from core import admission
+from core.admission import AdmissionMiddleware, TokenBucketLimiter
+from auth.jwt_auth import generate_access_token
+
+
+def make_app(limiter, max_concurrency=0):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {}
+
+    app.add_middleware(AdmissionMiddleware, max_concurrency=max_concurrency, limiter=limiter)
+    app.state.release = release
+    return app
+
+
+def client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_concurrency_limit_sheds_with_503():
+    app = make_app(TokenBucketLimiter((100, 100), {}, use_redis=False), max_concurrency=1)
+
+    async def scenario():
+        async with client(app) as c:
+            slow = asyncio.create_task(c.get("/slow"))
+            await asyncio.sleep(0.01)
+            shed = await c.get("/items/1")
+            app.state.release.set()
+            await slow
+            admitted = await c.get("/items/1")
+        return shed, admitted
+
+    shed, admitted = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert admitted.status_code == 200
+
+
+def test_token_bucket_per_user_and_route():
+    limiter = TokenBucketLimiter((0.5, 2), {"/slow": (100, 100)}, use_redis=False)
+    app = make_app(limiter)
+    alice = {"Authorization": f"Bearer {generate_access_token(1)}"}
+    bob = {"Authorization": f"Bearer {generate_access_token(2)}"}
+
+    async def scenario():
+        async with client(app) as c:
+            # ids differ but the route template, and so the bucket, is the same
+            statuses = [(await c.get(f"/items/{i}", headers=alice)).status_code for i in range(3)]
+            limited = await c.get("/items/9", headers=alice)
+            other_user = await c.get("/items/1", headers=bob)
+        return statuses, limited, other_user
+
+    statuses, limited, other_user = asyncio.run(scenario())
+    assert statuses == [200, 200, 429]
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "2"
+    assert other_user.status_code == 200
+
+
+def test_invalid_tokens_share_the_address_bucket():
+    app = make_app(TokenBucketLimiter((0.5, 1), {}, use_redis=False))
+
+    async def scenario():
+        async with client(app) as c:
+            first = await c.get("/items/1", headers={"Authorization": "Bearer made-up-1"})
+            second = await c.get("/items/1", headers={"Authorization": "Bearer made-up-2"})
+        return first.status_code, second.status_code
+
+    assert asyncio.run(scenario()) == (200, 429)
+
+
+def test_buckets_are_shared_through_redis(monkeypatch):
+    redis = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(admission, "get_redis", lambda: redis)
+    # two workers, each with its own limiter, one bucket in redis
+    workers = [TokenBucketLimiter((0.5, 2), {}, use_redis=True) for _ in range(2)]
+
+    async def scenario():
+        return [
+            (await workers[i % 2].hit("user:1", "/items/{item_id}"))[0] for i in range(3)
+        ]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+
+def test_redis_failure_falls_back_to_local_buckets(monkeypatch):
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise RedisConnectionError("redis is down")
+
+            return run
+
+    monkeypatch.setattr(admission, "get_redis", lambda: BrokenRedis())
+    limiter = TokenBucketLimiter((0.5, 1), {}, use_redis=True)
+    fallbacks = admission.RATE_LIMIT_FALLBACKS._value.get()
+
+    async def scenario():
+        return [(await limiter.hit("user:1", "/items/{item_id}"))[0] for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [True, False]
+    assert limiter._unavailable_until > 0
+    # the second check was answered in process during the backoff
+    assert admission.RATE_LIMIT_FALLBACKS._value.get() == fallbacks + 2
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from email.message import EmailMessage
+from core.email_util import Outbox, outbox
+from main import app
+from fastapi.testclient import TestClient
+
+
+class Sink:
+    """aiosmtpd handler standing in for smtp4dev."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.replies = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.replies:
+            return self.replies.pop(0)
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_sink():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+    sink.port = port
+    yield sink
+    controller.stop()
+
+
+def message(number: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "no-reply@example.com"
+    msg["To"] = f"user{number}@example.com"
+    msg["Subject"] = f"message {number}"
+    msg.set_content("hello")
+    return msg
+
+
+def make_outbox(sink, **kw):
+    options = dict(senders=1, retry_backoff=0.01, start_tls=False)
+    options.update(kw)
+    return Outbox("127.0.0.1", sink.port, **options)
+
+
+def test_outbox_sends_many_messages_per_session(smtp_sink):
+    box = make_outbox(smtp_sink)
+
+    async def scenario():
+        for i in range(20):
+            box.enqueue(message(i))
+        await box.flush(timeout=10)
+        await box.stop()
+
+    asyncio.run(scenario())
+    assert len(smtp_sink.messages) == 20
+    assert box.connections == 1
+    assert len(smtp_sink.sessions) == 1
+
+
+def test_outbox_reconnects_after_max_per_connection(smtp_sink):
+    box = make_outbox(smtp_sink, max_per_connection=5)
+
+    async def scenario():
+        for i in range(12):
+            box.enqueue(message(i))
+        await box.stop(timeout=10)
+
+    asyncio.run(scenario())
+    assert len(smtp_sink.messages) == 12
+    assert box.connections == 3
+
+
+def test_outbox_retries_temporary_failures(smtp_sink):
+    smtp_sink.replies = ["451 try again later", "421 closing"]
+    box = make_outbox(smtp_sink)
+
+    async def scenario():
+        box.enqueue(message(1))
+        await box.stop(timeout=10)
+
+    asyncio.run(scenario())
+    assert len(smtp_sink.messages) == 1
+    assert box.retried == 2
+    assert box.failed == 0
+
+
+def test_outbox_drops_permanent_failures(smtp_sink):
+    smtp_sink.replies = ["550 no such user"]
+    box = make_outbox(smtp_sink)
+
+    async def scenario():
+        box.enqueue(message(1))
+        box.enqueue(message(2))
+        await box.stop(timeout=10)
+
+    asyncio.run(scenario())
+    assert [m.rcpt_tos for m in smtp_sink.messages] == [["user2@example.com"]]
+    assert box.failed == 1
+    assert box.retried == 0
+
+
+def test_outbox_survives_a_message_that_can_not_be_sent(smtp_sink):
+    box = make_outbox(smtp_sink)
+    broken = message(1)
+    # aiosmtplib refuses to pick a sender among several resent blocks
+    broken["Resent-Date"] = "Mon, 1 Jan 2024 00:00:00 +0000"
+    broken["Resent-Date"] = "Tue, 2 Jan 2024 00:00:00 +0000"
+
+    async def scenario():
+        box.enqueue(broken)
+        box.enqueue(message(2))
+        await box.stop(timeout=10)
+
+    asyncio.run(scenario())
+    assert [m.rcpt_tos for m in smtp_sink.messages] == [["user2@example.com"]]
+    assert box.failed == 1
+    assert box.pending() == 0
+
+
+def test_send_mail_endpoint_returns_before_delivery(smtp_sink, monkeypatch):
+    monkeypatch.setattr(outbox, "hostname", "127.0.0.1")
+    monkeypatch.setattr(outbox, "port", smtp_sink.port)
+    monkeypatch.setattr(outbox, "smtp_options", {"start_tls": False})
+    with TestClient(app) as client:
+        response = client.get("/test-send-mail")
+        assert response.status_code == 202
+    # shutting the app down flushes the outbox
+    assert [m.rcpt_tos for m in smtp_sink.messages] == [["recipient@example.com"]]
@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from sqlalchemy import select, func
+import jobs.handlers
+from core.config import settings
+from jobs import queue
+from jobs.models import JobModel
+from jobs.registry import job
+from jobs.worker import JobWorker
+from tests.conftest import TestAsyncSessionLocal
+
+calls = {"flaky": 0}
+
+
+@job("test_flaky")
+async def flaky(fail_times: int):
+    calls["flaky"] += 1
+    if calls["flaky"] <= fail_times:
+        raise RuntimeError("boom")
+    return "ok"
+
+
+@job("test_noop")
+async def noop():
+    return None
+
+
+async def enqueue(name, payload=None, **kw):
+    async with TestAsyncSessionLocal() as db:
+        job_id = await queue.enqueue(db, name, payload, **kw)
+        await db.commit()
+    return job_id
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_RETRY_BACKOFF", 0)
+    return JobWorker(TestAsyncSessionLocal, concurrency=1, visibility_timeout=30)
+
+
+def test_initiate_task_runs_on_the_worker(anon_client, worker, monkeypatch):
+    monkeypatch.setattr(jobs.handlers.random, "randint", lambda a, b: 0)
+    response = anon_client.get("/initiate-task")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert anon_client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+
+    assert asyncio.run(worker.drain()) == 1
+    job_obj = anon_client.get(f"/jobs/{job_id}").json()
+    assert job_obj["status"] == "succeeded"
+    assert job_obj["attempts"] == 1
+    assert job_obj["result"] == {"task_id": 0}
+
+
+def test_job_not_found_response_404(anon_client):
+    assert anon_client.get("/jobs/doesnotexist").status_code == 404
+
+
+def test_failed_job_is_retried(anon_client, worker):
+    calls["flaky"] = 0
+    job_id = asyncio.run(enqueue("test_flaky", {"fail_times": 1}))
+    asyncio.run(worker.drain())
+    job_obj = anon_client.get(f"/jobs/{job_id}").json()
+    assert job_obj["status"] == "succeeded"
+    assert job_obj["attempts"] == 2
+    assert job_obj["result"] == "ok"
+
+
+def test_job_fails_after_max_attempts(anon_client, worker):
+    calls["flaky"] = 0
+    job_id = asyncio.run(enqueue("test_flaky", {"fail_times": 5}, max_attempts=2))
+    asyncio.run(worker.drain())
+    job_obj = anon_client.get(f"/jobs/{job_id}").json()
+    assert job_obj["status"] == "failed"
+    assert job_obj["attempts"] == 2
+    assert job_obj["error"] == "RuntimeError: boom"
+
+
+def test_expired_lease_makes_job_visible_again(anon_client):
+    async def scenario():
+        job_id = await enqueue("test_noop")
+        async with TestAsyncSessionLocal() as db:
+            # a worker that died right after claiming
+            lost = await queue.claim(db, "lost-worker", visibility_timeout=0)
+            await db.commit()
+        assert lost.id == job_id
+
+        worker = JobWorker(TestAsyncSessionLocal, concurrency=1, visibility_timeout=30)
+        assert await worker.drain() == 1
+
+        async with TestAsyncSessionLocal() as db:
+            # the lost worker can no longer complete the job it let expire
+            assert not await queue.mark_succeeded(db, job_id, "lost-worker", None)
+        return job_id
+
+    job_obj = anon_client.get(f"/jobs/{asyncio.run(scenario())}").json()
+    assert job_obj["status"] == "succeeded"
+    assert job_obj["attempts"] == 2
+
+
+def test_enqueue_unknown_job_is_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(enqueue("no_such_job"))
+
+
+def test_worker_loops_pick_up_new_jobs(anon_client):
+    async def scenario():
+        worker = JobWorker(
+            TestAsyncSessionLocal, concurrency=2, visibility_timeout=30, poll_interval=0.01
+        )
+        worker.start()
+        job_ids = [await enqueue("test_noop") for _ in range(4)]
+        for _ in range(200):
+            async with TestAsyncSessionLocal() as db:
+                done = await db.scalar(
+                    select(func.count()).where(
+                        JobModel.id.in_(job_ids), JobModel.status == "succeeded"
+                    )
+                )
+            if done == len(job_ids):
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return done
+
+    assert asyncio.run(scenario()) == 4
@@ -0,0 +1,59 @@
+import time
+import types
+import pytest
+from fastapi import HTTPException
+from auth import jwt_auth
+from auth.jwt_auth import (
+    claims_cache,
+    generate_access_token,
+    generate_refresh_token,
+    verify_token,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    claims_cache.clear()
+    yield
+    claims_cache.clear()
+
+
+def test_repeated_token_skips_signature_verification(monkeypatch):
+    token = generate_access_token(7)
+    assert verify_token(token, "access") == 7
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token decoded twice")
+
+    monkeypatch.setattr(jwt_auth.jwt, "decode", fail)
+    hits = claims_cache.hits
+    assert verify_token(token, "access") == 7
+    assert claims_cache.hits == hits + 1
+
+
+def test_cached_token_still_expires(monkeypatch):
+    token = generate_access_token(7, expires_in=60)
+    verify_token(token, "access")
+    later = types.SimpleNamespace(time=lambda: time.time() + 61)
+    monkeypatch.setattr(jwt_auth, "time", later)
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token, "access")
+    assert exc_info.value.detail == "Authentication failed, token expired"
+
+
+def test_cached_claims_are_checked_for_type():
+    token = generate_refresh_token(7)
+    assert verify_token(token, "refresh") == 7
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token, "access")
+    assert exc_info.value.detail == "Authentication failed, token type not valid"
+
+
+def test_tampered_token_is_not_cached():
+    header, payload, signature = generate_access_token(7).split(".")
+    tampered = ".".join([header, payload, signature[::-1]])
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            verify_token(tampered, "access")
+        assert exc_info.value.status_code == 401
+    assert len(claims_cache) == 0
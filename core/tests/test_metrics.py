@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+def sample(text: str, name: str, **labels) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            if all(f'{key}="{value}"' in line for key, value in labels.items()):
+                return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_by_route_template(auth_client, random_task):
+    before = auth_client.get("/metrics").text
+    response = auth_client.get(f"/tasks/{random_task.id}")
+    assert "X-Process-Time" in response.headers
+    auth_client.get("/tasks/999999")
+    after = auth_client.get("/metrics").text
+
+    labels = {"method": "GET", "route": "/tasks/{task_id}"}
+    for status in ("200", "404"):
+        assert sample(after, "http_requests_total", status=status, **labels) == (
+            sample(before, "http_requests_total", status=status, **labels) + 1
+        )
+    assert sample(after, "http_request_duration_seconds_count", **labels) == (
+        sample(before, "http_request_duration_seconds_count", **labels) + 2
+    )
+    assert sample(after, "http_response_size_bytes_sum", **labels) > sample(
+        before, "http_response_size_bytes_sum", **labels
+    )
+    # the scrape itself is not measured
+    assert 'route="/metrics"' not in after
+
+
+def test_metrics_unmatched_paths_share_a_label(anon_client):
+    anon_client.get("/no/such/path/1")
+    anon_client.get("/no/such/path/2")
+    text = anon_client.get("/metrics").text
+    assert "/no/such/path" not in text
+    assert sample(text, "http_requests_total", route="<unmatched>", status="404") >= 2
+
+
+WORKER = """
+from fastapi.testclient import TestClient
+from main import app
+with TestClient(app) as client:
+    for _ in range(3):
+        client.get("/is_ready")
+"""
+
+SCRAPER = """
+from fastapi.testclient import TestClient
+from main import app
+print(TestClient(app).get("/metrics").text)
+"""
+
+
+def test_metrics_aggregate_worker_processes():
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp()}
+    core = Path(__file__).resolve().parents[1]
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], cwd=core, env=env, check=True)
+    scrape = subprocess.run(
+        [sys.executable, "-c", SCRAPER],
+        cwd=core, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    assert sample(scrape, "http_requests_total", route="/is_ready", status="200") == 6
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.security import HTTPBasicCredentials
+from auth import basic_auth
+from auth.hashing import PasswordHasher, password_hasher
+from tests.conftest import TestAsyncSessionLocal
+
+
+def test_hasher_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    hashed = asyncio.run(hasher.hash("12345678"))
+    assert asyncio.run(hasher.verify("12345678", hashed))
+    assert not asyncio.run(hasher.verify("87654321", hashed))
+    hasher.shutdown()
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(hasher.hash("12345678"))
+    assert exc_info.value.status_code == 503
+    assert hasher.rejected == 1
+
+
+def test_rejected_hash_keeps_retry_after_over_http(anon_client, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    payload = {
+        "username": "hasher_overloaded",
+        "password": "a/@1234567",
+        "password_confirm": "a/@1234567",
+    }
+    response = anon_client.post("/users/register", json=payload)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+async def authenticate(username, password):
+    credentials = HTTPBasicCredentials(username=username, password=password)
+    async with TestAsyncSessionLocal() as db:
+        request = Request({"type": "http", "method": "GET", "headers": []})
+        return await basic_auth.get_authenticated_user(request, credentials, db)
+
+
+def test_basic_auth_skips_bcrypt_for_verified_credentials(monkeypatch):
+    basic_auth.verified_credentials.clear()
+    principal = asyncio.run(authenticate("testuser", "12345678"))
+    assert principal.username == "testuser"
+
+    async def fail_verify(*args):
+        raise AssertionError("bcrypt should not run for cached credentials")
+
+    monkeypatch.setattr(basic_auth.password_hasher, "verify", fail_verify)
+    assert asyncio.run(authenticate("testuser", "12345678")) == principal
+
+
+def test_basic_auth_does_not_cache_wrong_password():
+    basic_auth.verified_credentials.clear()
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate("testuser", "wrong-password"))
+    assert exc_info.value.status_code == 401
+    assert len(basic_auth.verified_credentials) == 0
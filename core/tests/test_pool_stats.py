@@ -0,0 +1,61 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, exc
+from core.config import settings
+from core.pool import InstrumentedQueuePool, instrument_engine, pool_status
+
+
+@pytest.fixture
+def pooled_engine():
+    def make(**kw):
+        path = os.path.join(tempfile.mkdtemp(), "pool.db")
+        engine = create_engine(f"sqlite:///{path}", poolclass=InstrumentedQueuePool, **kw)
+        instrument_engine(engine)
+        return engine
+
+    return make
+
+
+def test_pool_counts_checkouts_and_overflow(pooled_engine):
+    engine = pooled_engine(pool_size=1, max_overflow=1)
+    first = engine.connect()
+    second = engine.connect()
+    stats = pool_status(engine)
+    assert stats["checked_out"] == 2
+    assert stats["overflow_checkouts"] == 1
+    first.close()
+    second.close()
+
+    stats = pool_status(engine)
+    assert stats["checkouts"] == 2
+    assert stats["checkins"] == 2
+    assert stats["checked_out"] == 0
+
+
+def test_pool_counts_timeouts_and_survives_dispose(pooled_engine):
+    engine = pooled_engine(pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    stats = pool_status(engine)
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms_max"] >= 50
+
+    engine.dispose()
+    engine.connect().close()
+    assert pool_status(engine)["timeouts"] == 1
+    assert pool_status(engine)["checkouts"] == 2
+
+
+def test_internal_stats_requires_token(anon_client, monkeypatch):
+    response = anon_client.get("/internal/stats")
+    assert response.status_code == 404
+
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "secret")
+    response = anon_client.get("/internal/stats", headers={"X-Internal-Token": "wrong"})
+    assert response.status_code == 404
+    response = anon_client.get("/internal/stats", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    assert {"database", "principal_cache", "task_cache"} <= response.json().keys()
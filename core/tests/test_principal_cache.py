@@ -0,0 +1,40 @@
+import fakeredis
+from auth import principal
+from auth.principal import principal_cache
+from users.models import UserModel
+
+
+def test_principal_served_from_cache(auth_client):
+    principal_cache.clear()
+    lookups = principal_cache.db_lookups
+
+    for _ in range(3):
+        assert auth_client.get("/tasks").status_code == 200
+
+    assert principal_cache.db_lookups == lookups + 1
+    assert principal_cache.local.hits >= 2
+
+
+def test_principal_invalidated_on_deactivation(auth_client, db_session):
+    assert auth_client.get("/tasks").status_code == 200
+    user = db_session.query(UserModel).filter_by(username="testuser").one()
+    try:
+        user.is_active = False
+        db_session.commit()
+        response = auth_client.get("/tasks")
+        assert response.status_code == 401
+    finally:
+        user.is_active = True
+        db_session.commit()
+    assert auth_client.get("/tasks").status_code == 200
+
+
+def test_invalidation_outside_the_event_loop_reaches_redis(monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(principal, "get_sync_redis", lambda: redis)
+    monkeypatch.setattr(principal_cache, "use_redis", True)
+    redis.set("principal:7", "{}")
+
+    principal_cache.invalidate(7)
+
+    assert redis.get("principal:7") is None
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import pytest
+from fastapi.testclient import TestClient
+from fastapi import HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, delete, insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from core import database
+from core.database import Base, get_async_db, get_async_read_db, read_your_writes
+from auth import token_auth
+from auth.jwt_auth import generate_access_token
+from auth.principal import principal_cache
+from auth.token_auth import hash_token, token_cache
+from main import app
+from tasks.cache import task_cache
+from tasks.models import TaskModel
+from tasks.stats import rebuild_stats_statements
+from users.models import TokenModel, UserModel
+
+
+@pytest.fixture
+def replicated(monkeypatch):
+    """A primary and a replica sqlite file, the replica a snapshot of the primary."""
+    directory = tempfile.mkdtemp()
+    primary_path = os.path.join(directory, "primary.db")
+    replica_path = os.path.join(directory, "replica.db")
+    engine = create_engine(f"sqlite:///{primary_path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        user = UserModel(username="replicated", password="x")
+        db.add(user)
+        db.flush()
+        task = TaskModel(user_id=user.id, title="first title", is_completed=False)
+        db.add(task)
+        db.flush()
+        db.add(TokenModel(user_id=user.id, token_hash=hash_token("replicated-token")))
+        for statement in rebuild_stats_statements(user.id):
+            db.execute(statement)
+        db.commit()
+        user_id, task_id = user.id, task.id
+    shutil.copy(primary_path, replica_path)
+
+    primary = create_async_engine(f"sqlite+aiosqlite:///{primary_path}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{replica_path}")
+    monkeypatch.setattr(
+        database,
+        "AsyncSessionLocal",
+        async_sessionmaker(bind=primary, autoflush=False, expire_on_commit=False),
+    )
+    monkeypatch.setattr(
+        database, "AsyncReadSessionLocal", database.replica_sessionmaker(primary, replica)
+    )
+    monkeypatch.setattr(database, "replica_async_engine", replica)
+    monkeypatch.setattr(task_cache, "enabled", False)
+    overrides = {
+        dependency: app.dependency_overrides.pop(dependency)
+        for dependency in (get_async_db, get_async_read_db)
+    }
+    principal_cache.clear()
+    token_cache.local.clear()
+    read_your_writes.local.clear()
+
+    yield engine, user_id, task_id
+
+    app.dependency_overrides.update(overrides)
+    principal_cache.clear()
+    token_cache.local.clear()
+    read_your_writes.local.clear()
+    engine.dispose()
+    asyncio.run(primary.dispose())
+    asyncio.run(replica.dispose())
+
+
+def test_reads_use_the_replica_until_the_user_writes(replicated):
+    engine, user_id, task_id = replicated
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {generate_access_token(user_id)}"
+    # the principal lookup reads the primary, only cached principals use the replica
+    assert client.get(f"/tasks/{task_id}").status_code == 200
+
+    # a write the replica has not caught up with
+    with engine.begin() as connection:
+        connection.execute(update(TaskModel).filter_by(id=task_id).values(title="second title"))
+    assert client.get(f"/tasks/{task_id}").json()["title"] == "first title"
+
+    response = client.put(f"/tasks/{task_id}", json={"title": "third title", "is_completed": True})
+    assert response.status_code == 200
+    assert client.get(f"/tasks/{task_id}").json()["title"] == "third title"
+    assert client.get("/tasks/stats").json()["completed"] == 1
+
+    # once the pin expires reads go back to the replica
+    read_your_writes.local.clear()
+    assert client.get(f"/tasks/{task_id}").json()["title"] == "first title"
+
+
+def test_routed_session_sends_writes_to_the_primary(replicated):
+    engine, user_id, task_id = replicated
+
+    async def scenario():
+        async with database.AsyncReadSessionLocal() as db:
+            await db.execute(insert(TaskModel).values(user_id=user_id, title="routed insert"))
+            await db.commit()
+            titles = await db.execute(select(TaskModel.title).filter_by(user_id=user_id))
+            return sorted(titles.scalars())
+
+    # the write pinned the session, it reads what it wrote
+    assert asyncio.run(scenario()) == ["first title", "routed insert"]
+    with engine.connect() as connection:
+        titles = connection.execute(select(TaskModel.title).filter_by(user_id=user_id))
+        assert sorted(titles.scalars()) == ["first title", "routed insert"]
+
+
+def test_stale_replica_does_not_keep_a_revoked_token(replicated):
+    engine, user_id, task_id = replicated
+    # a revoke the replica has not caught up with
+    with engine.begin() as connection:
+        connection.execute(delete(TokenModel).filter_by(user_id=user_id))
+
+    async def authenticate():
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials="replicated-token"
+        )
+        request = Request({"type": "http", "method": "GET", "headers": []})
+        async with database.AsyncReadSessionLocal() as db:
+            return await token_auth.get_authenticated_user(request, credentials, db)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate())
+    assert exc_info.value.status_code == 401
+    assert token_cache.local.get(hash_token("replicated-token")) is None
+
+
+def test_writes_are_not_pinned_without_a_replica(auth_client):
+    pins = read_your_writes.pins
+    payload = {"title": "write without a replica", "is_completed": False}
+    assert auth_client.post("/tasks", json=payload).status_code == 200
+    assert read_your_writes.pins == pins
+
+
+def test_pins_expire():
+    pins = database.ReadYourWrites(ttl=0.05, use_redis=False)
+    asyncio.run(pins.pin(7))
+    assert asyncio.run(pins.is_pinned(7))
+    assert not asyncio.run(pins.is_pinned(8))
+    asyncio.run(asyncio.sleep(0.06))
+    assert not asyncio.run(pins.is_pinned(7))
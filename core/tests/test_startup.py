@@ -0,0 +1,57 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from core.database import Base
+from core.pool import InstrumentedAsyncQueuePool, instrument_engine, pool_status
+from core.warmup import warm_up
+
+CORE_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_defers_sentry_and_scheduler():
+    probe = "import sys, main; print('sentry_sdk' in sys.modules, 'apscheduler' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=CORE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.split() == ["False", "False"]
+
+
+def test_warm_up_fills_the_pool_and_compiles_hot_statements():
+    path = os.path.join(tempfile.mkdtemp(), "warmup.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=InstrumentedAsyncQueuePool, pool_size=3
+    )
+    instrument_engine(engine.sync_engine)
+
+    async def scenario():
+        await warm_up(engine, async_sessionmaker(bind=engine))
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    stats = pool_status(engine.sync_engine)
+    assert stats["connects"] == 3
+    assert len(engine.sync_engine._compiled_cache) >= 4
+
+
+def test_warm_up_failure_does_not_stop_startup(caplog):
+    missing = os.path.join(tempfile.mkdtemp(), "missing", "warmup.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{missing}")
+
+    async def scenario():
+        await warm_up(engine, async_sessionmaker(bind=engine))
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    assert "database warm-up failed" in caplog.text
@@ -0,0 +1,63 @@
+import asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+from starlette.datastructures import QueryParams
+from tasks.cache import task_cache, TaskQueryCache, MemoryCacheBackend
+
+
+def test_task_list_served_from_cache(auth_client):
+    first = auth_client.get("/tasks", params={"limit": 4})
+    hits = task_cache.hits
+    second = auth_client.get("/tasks", params={"limit": 4})
+    assert task_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+
+def test_task_cache_invalidated_by_write(auth_client, random_task):
+    url = f"/tasks/{random_task.id}"
+    auth_client.get(url)
+    payload = {"title": "title written past the cache", "is_completed": True}
+    auth_client.put(url, json=payload)
+
+    misses = task_cache.misses
+    response = auth_client.get(url)
+    assert task_cache.misses == misses + 1
+    assert response.json()["title"] == payload["title"]
+
+
+def test_task_cache_can_be_disabled(auth_client, monkeypatch):
+    monkeypatch.setattr(task_cache, "enabled", False)
+    hits, misses = task_cache.hits, task_cache.misses
+    auth_client.get("/tasks")
+    auth_client.get("/tasks")
+    assert (task_cache.hits, task_cache.misses) == (hits, misses)
+
+
+def test_failed_invalidation_fails_closed(monkeypatch):
+    backend = MemoryCacheBackend()
+    cache = TaskQueryCache(backend, ttl=60, enabled=True)
+    params = QueryParams("limit=4")
+
+    async def scenario():
+        _, generation = await cache.get(1, "list", params)
+        await cache.set(1, "list", params, generation, b"[]")
+        assert (await cache.get(1, "list", params))[0] is not None
+
+        async def broken_incr(key):
+            raise RedisConnectionError("redis is down")
+
+        monkeypatch.setattr(backend, "incr", broken_incr)
+        await cache.invalidate(1)
+        # the old entry must not be served while the bump is outstanding,
+        # even once the backend is tried again
+        cache._unavailable_until = 0.0
+        while_broken = await cache.get(1, "list", params)
+        monkeypatch.undo()
+        cache._unavailable_until = 0.0
+        after_bump = await cache.get(1, "list", params)
+        return while_broken, after_bump
+
+    while_broken, after_bump = asyncio.run(scenario())
+    assert while_broken == (None, None)
+    assert after_bump == (None, 1)
+    assert cache.stats()["unbumped_users"] == 0
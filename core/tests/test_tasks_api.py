@@ -1,3 +1,6 @@
+import json
+
+
 def test_tasks_list_response_401(anon_client):
     
     response = anon_client.get("/tasks")
@@ -15,7 +18,235 @@ def test_tasks_detail_response_200(auth_client,random_task):
     response = auth_client.get(f"/tasks/{task_obj.id}")
     assert response.status_code == 200
 
+
 def test_tasks_detail_response_404(auth_client):
 
     response = auth_client.get(f"/tasks/1000")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_tasks_create_response_200(auth_client):
+    payload = {
+        "title": "write the async port",
+        "description": "move the routes to AsyncSession",
+        "is_completed": False,
+    }
+    response = auth_client.post("/tasks", json=payload)
+    assert response.status_code == 200
+    assert response.json()["title"] == payload["title"]
+
+
+def test_tasks_update_response_200(auth_client, random_task):
+    payload = {"title": "updated task title", "is_completed": True}
+    response = auth_client.put(f"/tasks/{random_task.id}", json=payload)
+    assert response.status_code == 200
+    assert response.json()["title"] == payload["title"]
+    assert response.json()["is_completed"] is True
+
+
+def test_tasks_delete_response_204(auth_client):
+    payload = {"title": "task to be deleted", "is_completed": False}
+    task_id = auth_client.post("/tasks", json=payload).json()["id"]
+    response = auth_client.delete(f"/tasks/{task_id}")
+    assert response.status_code == 204
+    response = auth_client.get(f"/tasks/{task_id}")
+    assert response.status_code == 404
+
+
+def test_tasks_list_cursor_pagination(auth_client):
+    seen = []
+    response = auth_client.get("/tasks", params={"limit": 3})
+    seen.extend(task["id"] for task in response.json())
+    while "X-Next-Cursor" in response.headers:
+        response = auth_client.get(
+            "/tasks",
+            params={"limit": 3, "cursor": response.headers["X-Next-Cursor"]},
+        )
+        assert response.status_code == 200
+        seen.extend(task["id"] for task in response.json())
+
+    everything = auth_client.get("/tasks", params={"limit": 50}).json()
+    assert seen == [task["id"] for task in everything]
+
+
+def test_tasks_list_invalid_cursor_response_400(auth_client):
+    response = auth_client.get("/tasks", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_tasks_bulk_create_update_delete(auth_client):
+    stats_before = auth_client.get("/tasks/stats").json()
+    items = [
+        {"title": f"bulk created task {i}", "is_completed": False}
+        for i in range(5)
+    ]
+    response = auth_client.post("/tasks/bulk", json={"items": items})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created"] * 5
+    task_ids = [r["id"] for r in results]
+
+    updates = [
+        {"id": task_id, "title": "bulk updated task", "is_completed": True}
+        for task_id in task_ids[:2]
+    ] + [{"id": 100000, "title": "missing task", "is_completed": True}]
+    response = auth_client.patch("/tasks/bulk", json={"items": updates})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == [
+        "updated",
+        "updated",
+        "not_found",
+    ]
+    assert auth_client.get(f"/tasks/{task_ids[0]}").json()["is_completed"] is True
+    stats = auth_client.get("/tasks/stats").json()
+    assert stats["total"] == stats_before["total"] + 5
+    assert stats["completed"] == stats_before["completed"] + 2
+
+    response = auth_client.request(
+        "DELETE", "/tasks/bulk", json={"ids": task_ids + [100000]}
+    )
+    assert response.status_code == 200
+    statuses = [r["status"] for r in response.json()["results"]]
+    assert statuses == ["deleted"] * 5 + ["not_found"]
+    assert auth_client.get("/tasks/stats").json() == stats_before
+    assert auth_client.get(f"/tasks/{task_ids[0]}").status_code == 404
+
+
+def test_tasks_bulk_update_keeps_fields_left_out(auth_client):
+    payload = {"title": "described task", "description": "keep me", "is_completed": False}
+    created = auth_client.post("/tasks", json=payload).json()
+    other = auth_client.post("/tasks", json=payload).json()
+
+    updates = [
+        {"id": created["id"], "title": "renamed task", "is_completed": True},
+        {"id": other["id"], "title": "renamed other", "description": None,
+         "is_completed": False},
+    ]
+    response = auth_client.patch("/tasks/bulk", json={"items": updates})
+    assert response.status_code == 200
+
+    task = auth_client.get(f"/tasks/{created['id']}").json()
+    assert task["title"] == "renamed task"
+    assert task["description"] == "keep me"
+    assert auth_client.get(f"/tasks/{other['id']}").json()["description"] is None
+
+
+def test_tasks_bulk_create_rejects_oversized_batch(auth_client):
+    items = [{"title": "too many tasks", "is_completed": False}] * 1001
+    response = auth_client.post("/tasks/bulk", json={"items": items})
+    assert response.status_code == 422
+
+
+def test_tasks_export_streams_ndjson(auth_client):
+    response = auth_client.get("/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    listed = auth_client.get("/tasks", params={"limit": 50}).json()
+    assert [task["id"] for task in exported] == [task["id"] for task in listed]
+
+
+def test_tasks_stats_follow_writes(auth_client):
+    before = auth_client.get("/tasks/stats").json()
+    assert before["total"] == before["completed"] + before["open"]
+
+    payload = {"title": "task counted in stats", "is_completed": False}
+    task_id = auth_client.post("/tasks", json=payload).json()["id"]
+    auth_client.put(f"/tasks/{task_id}", json={**payload, "is_completed": True})
+    # a put that leaves the state alone does not count it again
+    response = auth_client.put(
+        f"/tasks/{task_id}", json={**payload, "is_completed": True}
+    )
+    assert response.json()["is_completed"] is True
+    assert "was_completed" not in response.json()
+    stats = auth_client.get("/tasks/stats").json()
+    assert stats["total"] == before["total"] + 1
+    assert stats["completed"] == before["completed"] + 1
+
+    response = auth_client.get("/tasks", params={"completed": True})
+    assert response.headers["X-Total-Count"] == str(stats["completed"])
+
+    auth_client.delete(f"/tasks/{task_id}")
+    assert auth_client.get("/tasks/stats").json() == before
+    response = auth_client.get("/tasks")
+    assert response.headers["X-Total-Count"] == str(before["total"])
+
+
+def test_tasks_conditional_get_returns_304(auth_client, random_task):
+    for url in ("/tasks", f"/tasks/{random_task.id}"):
+        response = auth_client.get(url)
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        response = auth_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+
+def test_tasks_etag_changes_after_write(auth_client):
+    etag = auth_client.get("/tasks").headers["ETag"]
+    payload = {"title": "task changing the etag", "is_completed": False}
+    task_id = auth_client.post("/tasks", json=payload).json()["id"]
+
+    response = auth_client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    auth_client.delete(f"/tasks/{task_id}")
+
+
+def test_tasks_update_and_delete_missing_task_response_404(auth_client):
+    payload = {"title": "task that does not exist", "is_completed": True}
+    assert auth_client.put("/tasks/100000", json=payload).status_code == 404
+    assert auth_client.delete("/tasks/100000").status_code == 404
+
+
+def test_tasks_update_without_flip_keeps_stats(auth_client):
+    payload = {"title": "task keeping its state", "is_completed": True}
+    task_id = auth_client.post("/tasks", json=payload).json()["id"]
+    before = auth_client.get("/tasks/stats").json()
+
+    response = auth_client.put(
+        f"/tasks/{task_id}", json={**payload, "title": "renamed, still completed"}
+    )
+    assert response.json()["title"] == "renamed, still completed"
+    assert auth_client.get("/tasks/stats").json() == before
+    auth_client.delete(f"/tasks/{task_id}")
+
+
+def test_tasks_search_ranked_and_scoped(auth_client):
+    auth_client.post(
+        "/tasks",
+        json={"title": "renew passport", "description": "bring photos", "is_completed": False},
+    )
+    auth_client.post(
+        "/tasks",
+        json={"title": "buy photo frame", "description": "for the passport pictures", "is_completed": False},
+    )
+    response = auth_client.get("/tasks/search", params={"q": "passport"})
+    assert response.status_code == 200
+    titles = [task["title"] for task in response.json()]
+    # a title match ranks above a description match
+    assert titles == ["renew passport", "buy photo frame"]
+
+    response = auth_client.get("/tasks/search", params={"q": "photo pass"})
+    assert len(response.json()) == 2
+    response = auth_client.get("/tasks/search", params={"q": "passport", "limit": 1, "offset": 1})
+    assert [task["title"] for task in response.json()] == ["buy photo frame"]
+
+
+def test_tasks_search_follows_updates_and_deletes(auth_client):
+    task_id = auth_client.post(
+        "/tasks", json={"title": "water the cactus", "is_completed": False}
+    ).json()["id"]
+    auth_client.put(f"/tasks/{task_id}", json={"title": "water the ferns", "is_completed": False})
+    assert auth_client.get("/tasks/search", params={"q": "cactus"}).json() == []
+    assert len(auth_client.get("/tasks/search", params={"q": "ferns"}).json()) == 1
+
+    auth_client.delete(f"/tasks/{task_id}")
+    assert auth_client.get("/tasks/search", params={"q": "ferns"}).json() == []
+
+
+def test_tasks_search_ignores_query_syntax(auth_client):
+    response = auth_client.get("/tasks/search", params={"q": '" OR * NEAR('})
+    assert response.status_code == 200
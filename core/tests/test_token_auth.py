@@ -0,0 +1,99 @@
+import asyncio
+import fakeredis.aioredis
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import select
+from auth import token_auth
+from auth.token_auth import hash_token, token_cache
+from users.models import TokenModel
+from tests.conftest import TestAsyncSessionLocal
+
+
+async def authenticate(token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    async with TestAsyncSessionLocal() as db:
+        request = Request({"type": "http", "method": "GET", "headers": []})
+        return await token_auth.get_authenticated_user(request, credentials, db)
+
+
+def test_token_is_stored_as_digest(auth_client, db_session):
+    response = auth_client.post("/users/tokens")
+    assert response.status_code == 201
+    token = response.json()["token"]
+    stored = db_session.execute(
+        select(TokenModel.token_hash).filter_by(id=response.json()["id"])
+    ).scalar_one()
+    assert stored == hash_token(token)
+    assert len(stored) == 64
+
+
+def test_token_lookup_is_cached(auth_client):
+    token = auth_client.post("/users/tokens").json()["token"]
+    # issuing primes the cache, dropping it exercises the database lookup
+    assert token_cache.local.pop(hash_token(token)) is not None
+    lookups = token_cache.db_lookups
+    first = asyncio.run(authenticate(token))
+    second = asyncio.run(authenticate(token))
+    assert first == second
+    assert first.username == "testuser"
+    assert token_cache.db_lookups == lookups + 1
+
+
+def test_revoked_token_is_rejected(auth_client):
+    created = auth_client.post("/users/tokens").json()
+    asyncio.run(authenticate(created["token"]))
+
+    response = auth_client.delete(f"/users/tokens/{created['id']}")
+    assert response.status_code == 204
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate(created["token"]))
+    assert exc_info.value.status_code == 401
+    assert auth_client.delete(f"/users/tokens/{created['id']}").status_code == 404
+
+
+def test_unknown_token_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate("not-a-token"))
+    assert exc_info.value.status_code == 401
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(token_auth, "get_redis", lambda: redis)
+    monkeypatch.setattr(token_cache, "use_redis", True)
+    monkeypatch.setattr(token_cache, "_set_script", None)
+    monkeypatch.setattr(token_cache, "_unavailable_until", 0.0)
+    return redis
+
+
+def test_lookup_racing_a_revoke_can_not_recache_the_token(fake_redis):
+    digest = hash_token("raced-token")
+
+    async def scenario():
+        await token_cache.invalidate(digest)
+        # a lookup that read the token from the database before the revoke
+        await token_cache.set(digest, 1)
+        return await fake_redis.get(f"token:{digest}")
+
+    assert asyncio.run(scenario()) is None
+    assert token_cache.local.get(digest) is None
+
+
+def test_revoke_fails_when_redis_is_down(auth_client, db_session, fake_redis, monkeypatch):
+    created = auth_client.post("/users/tokens").json()
+
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            raise RedisConnectionError("redis is down")
+
+    monkeypatch.setattr(token_auth, "get_redis", lambda: BrokenRedis())
+    response = auth_client.delete(f"/users/tokens/{created['id']}")
+    assert response.status_code == 503
+    # nothing was committed, the token is still there
+    stored = db_session.execute(
+        select(TokenModel.token_hash).filter_by(id=created["id"])
+    ).scalar_one_or_none()
+    assert stored == hash_token(created["token"])
@@ -0,0 +1,84 @@
+import pytest
+from core.metrics import request_listeners
+from core.sentry import TraceSampler, budget_rates
+from main import app
+
+
+def http_scope(path, method="GET"):
+    return {"type": "http", "path": path, "method": method, "root_path": "", "headers": []}
+
+
+@pytest.fixture
+def sampler():
+    sampler = TraceSampler(
+        per_second=2.0,
+        min_rate=0.001,
+        slow_seconds=1.0,
+        boost_seconds=60.0,
+        route_rates={"/is_ready": 0.0},
+        default_rate=0.1,
+    )
+    sampler.router = app.router
+    return sampler
+
+
+def test_budget_rates_down_sample_hot_routes_only():
+    rates = budget_rates({"/a": 0.5, "/b": 100.0, "/c": 200.0}, budget=2.5, min_rate=0.0)
+    assert rates["/a"] == 1.0
+    assert rates["/b"] == pytest.approx(0.01)
+    assert rates["/c"] == pytest.approx(0.005)
+    assert budget_rates({"/b": 1e6}, budget=1.0, min_rate=0.001) == {"/b": 0.001}
+
+
+def test_sampler_adapts_to_route_rates(sampler):
+    context = {"asgi_scope": http_scope("/tasks/7")}
+    assert sampler(context) == 1.0
+    for _ in range(1000):
+        sampler.observe("GET", "/tasks/{task_id}", 200, 0.01)
+    sampler._adjust(sampler._window_start + 10.0)
+    assert sampler(context) == pytest.approx(0.02)
+    # a route without traffic in the last window is traced fully
+    assert sampler({"asgi_scope": http_scope("/tasks")}) == 1.0
+
+
+def test_pinned_routes_take_no_share_of_the_budget(sampler):
+    for _ in range(1000):
+        sampler.observe("GET", "/is_ready", 200, 0.001)
+    for _ in range(4):
+        sampler.observe("GET", "/tasks", 200, 0.01)
+    sampler._adjust(sampler._window_start + 2.0)
+    assert "/is_ready" not in sampler.rates
+    assert sampler.rates["/tasks"] == 1.0
+
+
+def test_sampler_boosts_routes_with_errors_or_slow_requests(sampler):
+    for _ in range(1000):
+        sampler.observe("GET", "/tasks", 200, 0.01)
+    sampler._adjust(sampler._window_start + 1.0)
+    context = {"asgi_scope": http_scope("/tasks")}
+    assert sampler(context) < 0.01
+
+    sampler.observe("GET", "/tasks", 500, 0.01)
+    assert sampler(context) == 1.0
+    sampler.boosted.clear()
+    sampler.observe("GET", "/tasks", 200, 2.5)
+    assert sampler(context) == 1.0
+
+
+def test_sampler_pins_routes_and_follows_parent_decisions(sampler):
+    ready = {"asgi_scope": http_scope("/is_ready"), "parent_sampled": True}
+    assert sampler(ready) == 0.0
+    assert sampler({"asgi_scope": http_scope("/tasks"), "parent_sampled": False}) == 0.0
+    assert sampler({"transaction_context": {"op": "queue.task"}}) == 0.1
+
+
+def test_metrics_middleware_feeds_request_listeners(anon_client):
+    seen = []
+    request_listeners.append(lambda *args: seen.append(args))
+    try:
+        anon_client.get("/tasks/5")
+    finally:
+        request_listeners.pop()
+    method, route, status, seconds = seen[0]
+    assert (method, route, status) == ("GET", "/tasks/{task_id}", 401)
+    assert seconds > 0
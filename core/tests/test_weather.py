@@ -0,0 +1,128 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from weather.service import WeatherService, weather_service
+
+
+class FakeUpstream:
+    """Local stand-in for open-meteo, counts the requests it answers."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.temperature = 20.0
+        self.fail = False
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(dict(request.url.params))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"current": {"temperature_2m": self.temperature}})
+
+
+def make_service(upstream, **kw):
+    options = dict(fresh_ttl=60, stale_ttl=60, precision=2)
+    options.update(kw)
+    return WeatherService(
+        "http://upstream.test", transport=httpx.MockTransport(upstream), **options
+    )
+
+
+def test_nearby_coordinates_share_an_entry():
+    upstream = FakeUpstream()
+    service = make_service(upstream)
+
+    async def scenario():
+        first = await service.current(35.70012, 51.40034)
+        second = await service.current(35.69991, 51.39987)
+        await service.aclose()
+        return first, second
+
+    (value, status), (_, second_status) = asyncio.run(scenario())
+    assert (status, second_status) == ("miss", "hit")
+    assert value == {"temperature_2m": 20.0}
+    assert upstream.calls == [
+        {"latitude": "35.7", "longitude": "51.4", "current": "temperature_2m,relative_humidity_2m"}
+    ]
+
+
+def test_concurrent_misses_are_coalesced():
+    upstream = FakeUpstream(delay=0.05)
+    service = make_service(upstream)
+
+    async def scenario():
+        results = await asyncio.gather(*(service.current(1.0, 2.0) for _ in range(20)))
+        await service.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(upstream.calls) == 1
+    assert all(value == {"temperature_2m": 20.0} for value, _ in results)
+
+
+def test_stale_entry_is_served_while_revalidating():
+    upstream = FakeUpstream(delay=0.01)
+    service = make_service(upstream, fresh_ttl=0)
+
+    async def scenario():
+        await service.current(1.0, 2.0)
+        upstream.temperature = 25.0
+        stale = await asyncio.gather(*(service.current(1.0, 2.0) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        refreshed = await service.current(1.0, 2.0)
+        await service.aclose()
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(scenario())
+    assert {status for _, status in stale} == {"stale"}
+    assert all(value == {"temperature_2m": 20.0} for value, _ in stale)
+    assert len(upstream.calls) == 2
+    assert refreshed == ({"temperature_2m": 25.0}, "stale")
+
+
+def test_upstream_failure_keeps_serving_stale():
+    upstream = FakeUpstream()
+    service = make_service(upstream, fresh_ttl=0)
+
+    async def scenario():
+        await service.current(1.0, 2.0)
+        upstream.fail = True
+        await service.current(1.0, 2.0)
+        await asyncio.sleep(0.01)
+        value = await service.current(1.0, 2.0)
+        await service.aclose()
+        return value
+
+    assert asyncio.run(scenario()) == ({"temperature_2m": 20.0}, "stale")
+    assert service.upstream_errors >= 1
+
+
+@pytest.fixture
+def fake_weather_upstream(monkeypatch):
+    upstream = FakeUpstream()
+    monkeypatch.setattr(weather_service, "transport", httpx.MockTransport(upstream))
+    monkeypatch.setattr(weather_service, "_client", None)
+    weather_service.cache.clear()
+    yield upstream
+    weather_service.cache.clear()
+
+
+def test_fetch_current_weather_endpoint(fake_weather_upstream):
+    with TestClient(app) as client:
+        response = client.get("/fetch-current-weather", params={"latitude": 10, "longitude": 20})
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "miss"
+        assert response.json() == {"current_weather": {"temperature_2m": 20.0}}
+        response = client.get("/fetch-current-weather", params={"latitude": 10.001, "longitude": 20})
+        assert response.headers["X-Cache"] == "hit"
+    assert len(fake_weather_upstream.calls) == 1
+
+
+def test_fetch_current_weather_upstream_down(fake_weather_upstream):
+    fake_weather_upstream.fail = True
+    with TestClient(app) as client:
+        response = client.get("/fetch-current-weather", params={"latitude": 11, "longitude": 21})
+    assert response.status_code == 500
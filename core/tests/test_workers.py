@@ -0,0 +1,64 @@
+import pytest
+from auth.jwt_auth import claims_cache
+from auth.principal import principal_cache
+from core import database, workers
+from core.database import read_your_writes
+from tasks.cache import task_cache, MemoryCacheBackend
+
+
+def test_worker_count_explicit_setting_wins(monkeypatch):
+    monkeypatch.setattr(workers, "available_cpus", lambda: 16)
+    assert workers.worker_count(configured=3) == 3
+
+
+def test_worker_count_follows_cpus_within_bounds(monkeypatch):
+    monkeypatch.setattr(workers, "available_cpus", lambda: 4)
+    assert workers.worker_count() == 4
+    assert workers.worker_count(per_core=2) == 8
+    assert workers.worker_count(per_core=2, maximum=6) == 6
+
+    monkeypatch.setattr(workers, "available_cpus", lambda: 1)
+    assert workers.worker_count() == 2
+    assert workers.worker_count(minimum=1) == 1
+
+
+def test_available_cpus_is_positive():
+    assert workers.available_cpus() >= 1
+
+
+@pytest.fixture
+def restore_task_cache():
+    backend, enabled = task_cache.backend, task_cache.enabled
+    yield
+    task_cache.backend, task_cache.enabled = backend, enabled
+
+
+def test_reset_after_fork_drops_inherited_state(restore_task_cache):
+    claims_cache.set("digest", (1, "access", 0), ttl=60)
+    principal_cache.local.set(1, object())
+    read_your_writes.local.set(1, True)
+    task_cache.backend, task_cache.enabled = MemoryCacheBackend(), True
+
+    workers.reset_after_fork(workers=1)
+    assert len(claims_cache) == 0
+    assert len(principal_cache.local) == 0
+    assert len(read_your_writes.local) == 0
+    assert task_cache.enabled
+
+    workers.reset_after_fork(workers=4)
+    assert not task_cache.enabled
+
+
+def test_reset_after_fork_forgets_the_replica_pool(monkeypatch):
+    disposed = []
+
+    class Engine:
+        def dispose(self, close=True):
+            disposed.append(close)
+
+    class ReplicaEngine:
+        sync_engine = Engine()
+
+    monkeypatch.setattr(database, "replica_async_engine", ReplicaEngine())
+    workers.reset_after_fork(workers=1)
+    assert disposed == [False]
@@ -48,7 +48,8 @@ class TokenModel(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    token = Column(String, nullable=False, unique=True)
+    # sha256 hex digest of the opaque token, the token itself is never stored
+    token_hash = Column(String(64), nullable=False, unique=True)
     created_date = Column(DateTime, server_default=func.now())
 
     user = relationship("UserModel", uselist=False)
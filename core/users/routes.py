@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Path, Depends, HTTPException, Query, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from users.schemas import *
 from users.models import UserModel, TokenModel
-from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db, pin_writer
 from typing import List
 import secrets
+from auth.hashing import password_hasher
 from auth.jwt_auth import (
     generate_access_token,
     generate_refresh_token,
     decode_refresh_token,
+    get_authenticated_user,
 )
+from auth.principal import Principal
+from auth.token_auth import hash_token, issue_token, revoke_token, token_cache
 
 router = APIRouter(tags=["users"], prefix="/users")
 
@@ -21,31 +26,26 @@ def generate_token(length=32):
 
 
 @router.post("/login")
-async def user_login(request: UserLoginSchema, db: Session = Depends(get_db)):
-    user_obj = (
-        db.query(UserModel)
-        .filter_by(username=request.username.lower())
-        .first()
+async def user_login(request: UserLoginSchema, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(UserModel).filter_by(username=request.username.lower())
     )
+    user_obj = result.scalars().first()
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid user aor password",
         )
-    if not user_obj.verify_password(request.password):
+    if not await password_hasher.verify(request.password, user_obj.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid user aor password",
         )
 
-    # Token Based Authentication
-    # token_obj = TokenModel(user_id = user_obj.id,token=generate_token())
-    # db.add(token_obj)
-    # db.commit()
-    # db.refresh(token_obj)
+    # Token Based Authentication: see POST /users/tokens
     access_token = generate_access_token(user_obj.id)
     refresh_token = generate_refresh_token(user_obj.id)
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "detail": "logged in successfully",
             "access_token": access_token,
@@ -56,28 +56,65 @@ async def user_login(request: UserLoginSchema, db: Session = Depends(get_db)):
 
 @router.post("/register")
 async def user_register(
-    request: UserRegisterSchema, db: Session = Depends(get_db)
+    request: UserRegisterSchema, db: AsyncSession = Depends(get_async_db)
 ):
-    if (
-        db.query(UserModel)
-        .filter_by(username=request.username.lower())
-        .first()
-    ):
+    result = await db.execute(
+        select(UserModel).filter_by(username=request.username.lower())
+    )
+    if result.scalars().first():
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="username already exists",
         )
-    user_obj = UserModel(username=request.username.lower())
-    user_obj.set_password(request.password)
+    user_obj = UserModel(
+        username=request.username.lower(),
+        password=await password_hasher.hash(request.password),
+    )
     db.add(user_obj)
-    db.commit()
-    return JSONResponse(status_code=status.HTTP_201_CREATED,content={"detail": "user registered successfully"})
+    await db.commit()
+    # the first authenticated requests must find the user on the replica
+    await pin_writer(user_obj.id)
+    return ORJSONResponse(status_code=status.HTTP_201_CREATED,content={"detail": "user registered successfully"})
 
 
 @router.post("/refresh-token")
 async def user_refresh_token(
-    request: UserRefreshTokenSchema, db: Session = Depends(get_db)
+    request: UserRefreshTokenSchema, db: AsyncSession = Depends(get_async_db)
 ):
     user_id = decode_refresh_token(request.token)
     access_token = generate_access_token(user_id)
-    return JSONResponse(content={"access_token": access_token})
+    return ORJSONResponse(content={"access_token": access_token})
+
+
+@router.post("/tokens", status_code=201)
+async def user_create_token(
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    token_id, token = await issue_token(db, user.id)
+    await db.commit()
+    # lookups of the new token must not depend on the replica having it
+    await token_cache.set(hash_token(token), user.id)
+    return ORJSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={
+            "detail": "token created, it is not shown again",
+            "id": token_id,
+            "token": token,
+        },
+    )
+
+
+@router.delete("/tokens/{token_id}", status_code=204)
+async def user_revoke_token(
+    token_id: int = Path(..., gt=0),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_authenticated_user),
+):
+    token_hash = await revoke_token(db, user.id, token_id)
+    if token_hash is None:
+        raise HTTPException(status_code=404, detail="Token not found")
+    # the tombstone is in place before the delete becomes visible, a failure
+    # leaves the transaction uncommitted and the token in place
+    await token_cache.invalidate(token_hash)
+    await db.commit()
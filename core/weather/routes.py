@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import ORJSONResponse
+from weather.service import weather_service
+
+router = APIRouter(tags=["weather"])
+
+
+@router.get("/fetch-current-weather", status_code=200)
+async def fetch_current_weather(
+    latitude: float = Query(40.7128, ge=-90, le=90),
+    longitude: float = Query(-74.0060, ge=-180, le=180),
+):
+    current_weather, cache_status = await weather_service.current(latitude, longitude)
+    headers = {"X-Cache": cache_status}
+    if current_weather:
+        return ORJSONResponse(
+            content={"current_weather": current_weather}, headers=headers
+        )
+    else:
+        return ORJSONResponse(
+            content={"detail": "Failed to fetch weather"},
+            status_code=500,
+            headers=headers,
+        )
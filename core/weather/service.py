@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+import httpx
+from core.cache import TTLCache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherService:
+    """Current weather from open-meteo behind a stale-while-revalidate cache.
+
+    Coordinates are rounded to `precision` decimals, so nearby requests share
+    one entry and one upstream call. An entry is fresh for `fresh_ttl`
+    seconds; for `stale_ttl` seconds after that it is still served while a
+    single background refresh runs. Concurrent misses of one key wait on the
+    same upstream request instead of sending their own.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        fresh_ttl: float,
+        stale_ttl: float,
+        precision: int,
+        timeout: float = 5.0,
+        maxsize: int = 10000,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.base_url = base_url
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+        self.timeout = timeout
+        self.transport = transport
+        self.cache = TTLCache(maxsize=maxsize, ttl=fresh_ttl + stale_ttl)
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self._client = None
+        self._inflight = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # pooled keep-alive connections, created once per process
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+
+    def quantize(self, latitude: float, longitude: float) -> tuple:
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+    async def current(self, latitude: float, longitude: float):
+        """Returns (current weather or None, "hit" | "stale" | "miss")."""
+        key = self.quantize(latitude, longitude)
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            if time.monotonic() - fetched_at < self.fresh_ttl:
+                return value, "hit"
+            self._refresh(key)
+            return value, "stale"
+        return await asyncio.shield(self._refresh(key)), "miss"
+
+    def _refresh(self, key: tuple) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key: tuple):
+        latitude, longitude = key
+        self.upstream_calls += 1
+        try:
+            response = await self.client.get(
+                "/v1/forecast",
+                params={
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "current": "temperature_2m,relative_humidity_2m",
+                },
+            )
+            response.raise_for_status()
+            value = response.json().get("current", {})
+        except (httpx.HTTPError, ValueError) as e:
+            # a stale entry, if any, keeps being served until it expires
+            self.upstream_errors += 1
+            logger.warning("weather upstream failed for %s: %s", key, e)
+            entry = self.cache.get(key)
+            return entry[0] if entry is not None else None
+        self.cache.set(key, (value, time.monotonic()))
+        return value
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "inflight": len(self._inflight),
+        }
+
+
+weather_service = WeatherService(
+    base_url=settings.WEATHER_API_URL,
+    fresh_ttl=settings.WEATHER_FRESH_TTL,
+    stale_ttl=settings.WEATHER_STALE_TTL,
+    precision=settings.WEATHER_COORD_PRECISION,
+    timeout=settings.WEATHER_TIMEOUT,
+)
@@ -2,4 +2,15 @@
 
 alembic upgrade heads
 
-fastapi run --host 0.0.0.0 --port 8000
\ No newline at end of file
+# per process metric files of the previous run would be summed into /metrics
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+# "production" pre-forks workers under gunicorn, see gunicorn_conf.py
+if [ "$SERVE_MODE" = "production" ]; then
+    exec gunicorn -c gunicorn_conf.py main:app
+fi
+
+exec fastapi run --host 0.0.0.0 --port 8000